@@ -57,6 +57,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # Changed to AllowAny as default
     ],
+    # orjson thay cho json của stdlib (tự quay về stdlib nếu chưa cài orjson)
+    'DEFAULT_RENDERER_CLASSES': [
+        'Vis4T_core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'Vis4T_core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 SIMPLE_JWT = {
@@ -142,6 +152,26 @@ DATABASES = {
 }
 
 
+# Cache
+# Teacher, quyền sở hữu, tiến độ import... phải thấy được từ mọi worker gunicorn:
+# production đặt REDIS_URL. Không có thì dùng LocMemCache riêng từng process (dev, test)
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'vis4t-default',
+        },
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -188,3 +218,16 @@ METABASE_URL = os.getenv('METABASE_URL', 'http://localhost:3000')
 METABASE_SECRET_KEY = os.getenv('METABASE_SECRET_KEY')
 METABASE_DASHBOARD_ID = os.getenv('METABASE_DASHBOARD_ID', '2')  # Class dashboard
 METABASE_STUDENT_DASHBOARD_ID = os.getenv('METABASE_STUDENT_DASHBOARD_ID', '3')  # Student dashboard
+
+# Roster import jobs (chạy nền trong thread pool của process web)
+IMPORT_JOB_WORKERS = int(os.getenv('IMPORT_JOB_WORKERS', '2'))
+IMPORT_JOB_STALE_SECONDS = int(os.getenv('IMPORT_JOB_STALE_SECONDS', '900'))
+# Khoảng tối thiểu giữa hai lần quét lại job đang chờ/treo (khi frontend hỏi tiến độ)
+IMPORT_JOB_RECOVERY_SECONDS = int(os.getenv('IMPORT_JOB_RECOVERY_SECONDS', '60'))
+# Số job đã xong giữ lại cho mỗi lớp (lịch sử + nhận ra file upload lại không đổi)
+IMPORT_JOB_HISTORY = int(os.getenv('IMPORT_JOB_HISTORY', '20'))
+# Thư mục lưu file upload chờ import; mọi worker phải dùng chung thư mục này
+IMPORT_UPLOAD_DIR = os.getenv('IMPORT_UPLOAD_DIR', str(BASE_DIR / 'media' / 'imports'))
+
+# Batch upload nhiều lớp (file zip): số process parse song song, mặc định bằng số CPU
+BATCH_IMPORT_PROCESSES = int(os.getenv('BATCH_IMPORT_PROCESSES', '0')) or None
@@ -0,0 +1,127 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import ClassAggregate, Student, UniversityClass
+
+# Các cột của Student tham gia vào ClassAggregate, theo đúng thứ tự này
+AGGREGATE_FIELDS = ('class_name_id', 'score_10', 'score_4', 'score_char', 'is_graduated')
+
+
+def aggregate_row(student):
+    return tuple(getattr(student, field) for field in AGGREGATE_FIELDS)
+
+
+def apply_student_delta(added=(), removed=()):
+    """
+    Cộng các dòng added và trừ các dòng removed vào ClassAggregate của lớp
+    tương ứng. Mỗi dòng là một tuple theo AGGREGATE_FIELDS.
+    """
+    deltas = defaultdict(lambda: {
+        'count': 0, 's10': 0.0, 's10sq': 0.0, 's4': 0.0, 's4sq': 0.0,
+        'chars': defaultdict(int), 'graduated': 0
+    })
+    for sign, rows in ((1, added), (-1, removed)):
+        for class_name, score_10, score_4, score_char, is_graduated in rows:
+            delta = deltas[class_name]
+            delta['count'] += sign
+            delta['s10'] += sign * score_10
+            delta['s10sq'] += sign * score_10 * score_10
+            delta['s4'] += sign * score_4
+            delta['s4sq'] += sign * score_4 * score_4
+            delta['chars'][score_char] += sign
+            delta['graduated'] += sign * int(bool(is_graduated))
+
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        for class_name in sorted(deltas):
+            delta = deltas[class_name]
+            aggregate, _ = ClassAggregate.objects.select_for_update().get_or_create(
+                class_name_id=class_name
+            )
+            aggregate.student_count += delta['count']
+            aggregate.score_10_sum += delta['s10']
+            aggregate.score_10_sumsq += delta['s10sq']
+            aggregate.score_4_sum += delta['s4']
+            aggregate.score_4_sumsq += delta['s4sq']
+            aggregate.graduated_count += delta['graduated']
+            chars = dict(aggregate.score_char_counts)
+            for score_char, count in delta['chars'].items():
+                chars[score_char] = chars.get(score_char, 0) + count
+            aggregate.score_char_counts = {k: v for k, v in chars.items() if v}
+            aggregate.version += 1
+            aggregate.save()
+
+            if delta['count']:
+                UniversityClass.objects.filter(class_name=class_name).update(
+                    number_of_student=aggregate.student_count
+                )
+
+
+def bump_class_version(class_name):
+    """Mark a class as changed without touching its aggregate values"""
+    updated = ClassAggregate.objects.filter(class_name_id=class_name).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        ClassAggregate.objects.get_or_create(class_name_id=class_name, defaults={'version': 1})
+
+
+def rebuild_class_aggregates(class_names=None):
+    """
+    Recompute ClassAggregate from the student table with two GROUP BY
+    queries. Returns the number of classes rebuilt.
+    """
+    classes = UniversityClass.objects.all()
+    students = Student.objects.all()
+    if class_names:
+        classes = classes.filter(class_name__in=class_names)
+        students = students.filter(class_name_id__in=class_names)
+
+    totals = {
+        row['class_name_id']: row
+        for row in students.values('class_name_id').annotate(
+            student_count=Count('student_id'),
+            score_10_sum=Sum('score_10'),
+            score_10_sumsq=Sum(F('score_10') * F('score_10')),
+            score_4_sum=Sum('score_4'),
+            score_4_sumsq=Sum(F('score_4') * F('score_4')),
+            graduated_count=Count('student_id', filter=Q(is_graduated=True)),
+        )
+    }
+    chars = defaultdict(dict)
+    for row in students.values('class_name_id', 'score_char').annotate(count=Count('student_id')):
+        chars[row['class_name_id']][row['score_char']] = row['count']
+
+    class_list = list(classes.values_list('class_name', flat=True))
+    with transaction.atomic():
+        # Giữ version tăng dần để ETag cũ không trùng với dữ liệu mới
+        versions = dict(
+            ClassAggregate.objects.filter(class_name_id__in=class_list)
+            .values_list('class_name_id', 'version')
+        )
+        ClassAggregate.objects.filter(class_name_id__in=class_list).delete()
+        aggregates = []
+        for class_name in class_list:
+            row = totals.get(class_name, {})
+            aggregates.append(ClassAggregate(
+                class_name_id=class_name,
+                student_count=row.get('student_count', 0),
+                score_10_sum=row.get('score_10_sum') or 0,
+                score_10_sumsq=row.get('score_10_sumsq') or 0,
+                score_4_sum=row.get('score_4_sum') or 0,
+                score_4_sumsq=row.get('score_4_sumsq') or 0,
+                graduated_count=row.get('graduated_count', 0),
+                score_char_counts=chars.get(class_name, {}),
+                version=versions.get(class_name, 0) + 1,
+            ))
+        ClassAggregate.objects.bulk_create(aggregates)
+        for aggregate in aggregates:
+            UniversityClass.objects.filter(class_name=aggregate.class_name_id).update(
+                number_of_student=aggregate.student_count
+            )
+    return len(aggregates)
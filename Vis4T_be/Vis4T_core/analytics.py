@@ -0,0 +1,390 @@
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+
+from .models import Student, Subject_class, Subject_student, UniversityClass
+
+STATS_FIELDS = ('score_10', 'score_4', 'score_char', 'passed_credit', 'is_graduated')
+
+# Biên các nhóm điểm cho histogram (thang 10 và thang 4)
+SCORE_10_BINS = np.arange(0, 11, 1.0)
+SCORE_4_BINS = np.arange(0, 4.5, 0.5)
+# Tỉ lệ tín chỉ đã tích lũy so với tổng tín chỉ của lớp
+CREDIT_PROGRESS_BINS = np.array([0, 0.25, 0.5, 0.75, 1.0])
+CREDIT_PROGRESS_LABELS = ['0-25%', '25-50%', '50-75%', '75-100%', '100%+']
+
+# Ngưỡng của các luật cảnh báo học vụ (thang 10)
+PASS_SCORE = 4.0
+AT_RISK_FAILED_CREDITS = 6
+AT_RISK_GPA_10 = 5.0
+AT_RISK_DECLINE = 1.0
+# Số tín chỉ tích lũy dưới tỉ lệ này so với tiến độ chuẩn của lớp
+AT_RISK_PACE_RATIO = 0.8
+AT_RISK_CACHE_TIMEOUT = 60 * 60
+OVERVIEW_CACHE_TIMEOUT = 60 * 60
+AT_RISK_THRESHOLDS = {
+    'pass_score': PASS_SCORE,
+    'failed_credits': AT_RISK_FAILED_CREDITS,
+    'gpa_10': AT_RISK_GPA_10,
+    'semester_decline': AT_RISK_DECLINE,
+    'pace_ratio': AT_RISK_PACE_RATIO,
+}
+
+
+def load_class_columns(class_name):
+    """Fetch the stats columns of every student in a class with one query"""
+    rows = list(Student.objects.filter(class_name_id=class_name).values_list(*STATS_FIELDS))
+    if not rows:
+        return None
+    score_10, score_4, score_char, passed_credit, is_graduated = zip(*rows)
+    return {
+        'score_10': np.asarray(score_10, dtype=float),
+        'score_4': np.asarray(score_4, dtype=float),
+        'score_char': np.asarray(score_char, dtype=object),
+        'passed_credit': np.asarray(passed_credit, dtype=float),
+        'is_graduated': np.asarray(is_graduated, dtype=bool),
+    }
+
+
+def summarize(values):
+    return {
+        'mean': round(float(np.mean(values)), 4),
+        'median': round(float(np.median(values)), 4),
+        'std': round(float(np.std(values)), 4),
+        'min': round(float(np.min(values)), 4),
+        'max': round(float(np.max(values)), 4),
+    }
+
+
+def histogram(values, bins):
+    # Giá trị đúng bằng biên trên (10.0, 4.0) được tính vào nhóm cuối
+    counts, edges = np.histogram(np.clip(values, bins[0], bins[-1]), bins=bins)
+    return [
+        {'from': float(edges[i]), 'to': float(edges[i + 1]), 'count': int(counts[i])}
+        for i in range(len(counts))
+    ]
+
+
+def compute_class_stats(columns, total_credit):
+    """
+    Vectorized class statistics: GPA summaries and histograms, score_char
+    distribution and credit-progress buckets.
+    """
+    if columns is None:
+        return {'number_of_student': 0}
+
+    letters, letter_counts = np.unique(columns['score_char'].astype(str), return_counts=True)
+
+    progress = columns['passed_credit'] / total_credit if total_credit else np.zeros_like(columns['passed_credit'])
+    bucket_index = np.digitize(progress, CREDIT_PROGRESS_BINS[1:])
+    bucket_counts = np.bincount(bucket_index, minlength=len(CREDIT_PROGRESS_LABELS))
+
+    return {
+        'number_of_student': int(columns['score_10'].size),
+        'graduated': int(np.count_nonzero(columns['is_graduated'])),
+        'score_10': summarize(columns['score_10']),
+        'score_4': summarize(columns['score_4']),
+        'score_10_histogram': histogram(columns['score_10'], SCORE_10_BINS),
+        'score_4_histogram': histogram(columns['score_4'], SCORE_4_BINS),
+        'score_char_distribution': {
+            str(letter): int(count) for letter, count in zip(letters, letter_counts)
+        },
+        'credit_progress': [
+            {'bucket': label, 'count': int(count)}
+            for label, count in zip(CREDIT_PROGRESS_LABELS, bucket_counts)
+        ],
+    }
+
+
+def partition(keys, columns):
+    """
+    Split parallel arrays by key with one stable argsort: returns
+    {key: {name: array}} with the rows of each key in their original order
+    """
+    if not keys.size:
+        return {}
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], keys.size]
+    columns = {name: values[order] for name, values in columns.items()}
+    return {
+        keys[start]: {name: values[start:end] for name, values in columns.items()}
+        for start, end in zip(starts, ends)
+    }
+
+
+def load_scores(class_names):
+    """
+    Subject scores of several classes with the subject credit and the
+    semester of the subject in the student's class, in one query (semester
+    is NULL for subjects outside the curriculum), split per class
+    """
+    semester = Subject_class.objects.filter(
+        class_name_id=OuterRef('student__class_name_id'), subject_id=OuterRef('subject_id')
+    ).values('semester_id')[:1]
+    rows = list(
+        Subject_student.objects.filter(student__class_name_id__in=class_names)
+        .annotate(semester_id=Subquery(semester))
+        .values_list('student__class_name_id', 'student_id', 'score_10', 'subject__credit', 'semester_id')
+    )
+    if not rows:
+        return {}
+    class_name, student_id, score_10, credit, semester_id = zip(*rows)
+    return partition(np.asarray(class_name, dtype=object), {
+        'student_id': np.asarray(student_id, dtype=object),
+        'score_10': np.asarray(score_10, dtype=float),
+        'credit': np.asarray(credit, dtype=float),
+        'semester_id': np.asarray([-1 if s is None else s for s in semester_id], dtype=int),
+    })
+
+
+def weighted_mean(totals, weights):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(weights > 0, totals / weights, np.nan)
+
+
+def compute_at_risk(students, scores, total_credit, total_semester):
+    """
+    Evaluate the at-risk rules for every student of a class.
+
+    students: (student_id, student_name, passed_credit) rows of the class.
+    scores: the arrays of the class from load_scores(), or None. Rules: failed credits, credit
+    weighted GPA, decline between the last two semesters with scores, and
+    credits behind the class pace (total_credit spread over total_semester,
+    up to the latest semester with scores). Only flagged students are
+    returned, the most flagged first.
+    """
+    if not students:
+        return []
+
+    student_ids = np.asarray([row[0] for row in students], dtype=object)
+    passed_credit = np.asarray([row[2] for row in students], dtype=float)
+    n = student_ids.size
+    position = {student_id: i for i, student_id in enumerate(student_ids)}
+
+    failed_credits = np.zeros(n)
+    gpa = np.full(n, np.nan)
+    decline = np.full(n, np.nan)
+    expected_credit = None
+
+    if scores is not None:
+        index = np.fromiter((position.get(s, -1) for s in scores['student_id']), dtype=int)
+        keep = index >= 0
+        index, score_10 = index[keep], scores['score_10'][keep]
+        credit, semester_id = scores['credit'][keep], scores['semester_id'][keep]
+
+        failed = score_10 < PASS_SCORE
+        failed_credits = np.bincount(index, weights=credit * failed, minlength=n)
+        gpa = weighted_mean(
+            np.bincount(index, weights=score_10 * credit, minlength=n),
+            np.bincount(index, weights=credit, minlength=n),
+        )
+
+        # Điểm trung bình từng học kỳ: ma trận (sinh viên x học kỳ)
+        in_curriculum = semester_id >= 0
+        semesters = np.unique(semester_id[in_curriculum])
+        if semesters.size:
+            column = np.searchsorted(semesters, semester_id[in_curriculum])
+            cell = index[in_curriculum] * semesters.size + column
+            size = n * semesters.size
+            weights = credit[in_curriculum]
+            by_semester = weighted_mean(
+                np.bincount(cell, weights=score_10[in_curriculum] * weights, minlength=size),
+                np.bincount(cell, weights=weights, minlength=size),
+            ).reshape(n, semesters.size)
+
+            # Hai học kỳ gần nhất có điểm của từng sinh viên
+            has_score = ~np.isnan(by_semester)
+            order = np.cumsum(has_score, axis=1)
+            last_count = order[:, -1]
+            rows = np.arange(n)
+            last = np.argmax(order == last_count[:, None], axis=1)
+            previous = np.argmax(order == (last_count - 1)[:, None], axis=1)
+            valid = last_count >= 2
+            decline[valid] = (
+                by_semester[rows[valid], previous[valid]] - by_semester[rows[valid], last[valid]]
+            )
+
+            if total_credit and total_semester:
+                current = min(int(semesters.max()), total_semester)
+                expected_credit = total_credit * current / total_semester
+
+    flags = {
+        'failed_credits': failed_credits >= AT_RISK_FAILED_CREDITS,
+        'low_gpa': np.nan_to_num(gpa, nan=np.inf) < AT_RISK_GPA_10,
+        'declining': np.nan_to_num(decline, nan=-np.inf) >= AT_RISK_DECLINE,
+        'behind_pace': (
+            passed_credit < AT_RISK_PACE_RATIO * expected_credit
+            if expected_credit else np.zeros(n, dtype=bool)
+        ),
+    }
+    names = list(flags)
+    matrix = np.column_stack([flags[name] for name in names])
+    flag_count = matrix.sum(axis=1)
+
+    def number(value):
+        return None if np.isnan(value) else round(float(value), 2)
+
+    result = []
+    for i in np.flatnonzero(flag_count):
+        result.append({
+            'student_id': str(student_ids[i]),
+            'student_name': students[i][1],
+            'flags': [name for name, on in zip(names, matrix[i]) if on],
+            'failed_credits': int(failed_credits[i]),
+            'gpa_10': number(gpa[i]),
+            'semester_decline': number(decline[i]),
+            'passed_credit': int(passed_credit[i]),
+            'expected_credit': round(expected_credit, 1) if expected_credit else None,
+        })
+    result.sort(key=lambda item: (-len(item['flags']), item['student_id']))
+    return result
+
+
+def at_risk_cache_key(class_name, version):
+    return f"class-at-risk:{class_name}:{version}"
+
+
+def build_classes_at_risk(class_names):
+    """
+    Payloads of the at-risk endpoint of several classes with three queries
+    in total: the classes, their students and their subject scores
+    """
+    classes = {
+        row['class_name']: row
+        for row in UniversityClass.objects.filter(class_name__in=class_names)
+        .values('class_name', 'total_credit', 'total_semester')
+    }
+    students = {class_name: [] for class_name in classes}
+    for class_name, *row in (
+        Student.objects.filter(class_name_id__in=classes)
+        .order_by('class_name_id', 'student_id')
+        .values_list('class_name_id', 'student_id', 'student_name', 'passed_credit')
+    ):
+        students[class_name].append(tuple(row))
+    scores = load_scores(list(classes))
+
+    result = {}
+    for class_name, university_class in classes.items():
+        at_risk = compute_at_risk(
+            students[class_name], scores.get(class_name),
+            university_class['total_credit'], university_class['total_semester']
+        )
+        result[class_name] = {
+            'class_name': class_name,
+            'number_of_student': len(students[class_name]),
+            'at_risk_count': len(at_risk),
+            'thresholds': AT_RISK_THRESHOLDS,
+            'students': at_risk,
+        }
+    return result
+
+
+def build_class_at_risk(class_name):
+    """Payload of the at-risk endpoint of a class"""
+    try:
+        return build_classes_at_risk([class_name])[class_name]
+    except KeyError:
+        raise UniversityClass.DoesNotExist(class_name) from None
+
+
+def get_class_at_risk(class_name, version):
+    """build_class_at_risk() cached per class version (uncached when the class has no version)"""
+    if version is None:
+        return build_class_at_risk(class_name)
+    cache_key = at_risk_cache_key(class_name, version)
+    data = cache.get(cache_key)
+    if data is None:
+        data = build_class_at_risk(class_name)
+        cache.set(cache_key, data, AT_RISK_CACHE_TIMEOUT)
+    return data
+
+
+def load_at_risk_counts(versions):
+    """
+    at_risk_count of every (class_name, version), read from the cached
+    at-risk payloads with one get_many; the missing classes are computed
+    together by build_classes_at_risk() and cached per class
+    """
+    cached = cache.get_many([at_risk_cache_key(name, version) for name, version in versions if version is not None])
+    counts = {}
+    missing = {}
+    for class_name, version in versions:
+        data = cached.get(at_risk_cache_key(class_name, version)) if version is not None else None
+        if data is None:
+            missing[class_name] = version
+        else:
+            counts[class_name] = data['at_risk_count']
+
+    if missing:
+        built = build_classes_at_risk(list(missing))
+        cache.set_many(
+            {
+                at_risk_cache_key(class_name, version): built[class_name]
+                for class_name, version in missing.items()
+                if version is not None and class_name in built
+            },
+            AT_RISK_CACHE_TIMEOUT
+        )
+        for class_name, data in built.items():
+            counts[class_name] = data['at_risk_count']
+    return counts
+
+
+def load_teacher_class_groups(teacher):
+    """
+    One GROUP BY (class, score_char) over the students of every class of a
+    teacher: counts, score sums and graduates per group
+    """
+    return list(
+        Student.objects.filter(class_name__teacher=teacher)
+        .values('class_name_id', 'score_char')
+        .annotate(
+            count=Count('student_id'),
+            score_10_sum=Sum('score_10'),
+            score_4_sum=Sum('score_4'),
+            graduated=Count('student_id', filter=Q(is_graduated=True)),
+        )
+        .order_by()
+    )
+
+
+def compute_teacher_overview(class_names, groups, at_risk_counts):
+    """
+    Fold the (class, score_char) groups into one summary per class, in the
+    order of class_names. at_risk_counts (from load_at_risk_counts) uses the
+    same rules as the per-class at-risk endpoint.
+    """
+    classes = {
+        class_name: {
+            'class_name': class_name, 'number_of_student': 0,
+            'score_10_mean': None, 'score_4_mean': None,
+            'score_char_distribution': {}, 'graduation_rate': None,
+            'at_risk_count': at_risk_counts.get(class_name, 0),
+            '_score_10_sum': 0.0, '_score_4_sum': 0.0, '_graduated': 0,
+        }
+        for class_name in class_names
+    }
+    for group in groups:
+        summary = classes.get(group['class_name_id'])
+        if summary is None:
+            continue
+        summary['number_of_student'] += group['count']
+        summary['score_char_distribution'][group['score_char']] = group['count']
+        summary['_score_10_sum'] += group['score_10_sum'] or 0
+        summary['_score_4_sum'] += group['score_4_sum'] or 0
+        summary['_graduated'] += group['graduated']
+
+    result = []
+    for summary in classes.values():
+        count = summary['number_of_student']
+        score_10_sum = summary.pop('_score_10_sum')
+        score_4_sum = summary.pop('_score_4_sum')
+        graduated = summary.pop('_graduated')
+        if count:
+            summary['score_10_mean'] = round(score_10_sum / count, 4)
+            summary['score_4_mean'] = round(score_4_sum / count, 4)
+            summary['graduation_rate'] = round(graduated / count, 4)
+        result.append(summary)
+    return result
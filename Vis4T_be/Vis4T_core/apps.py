@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class Vis4TCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Vis4T_core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,142 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+
+import django
+from django.conf import settings
+from openpyxl import load_workbook
+
+from .models import ImportJob, UniversityClass
+from .utils import DataProcessor, get_cached_upload, save_upload
+
+# Giới hạn tổng dung lượng giải nén để tránh zip bomb
+BATCH_MAX_UNCOMPRESSED = 200 * 1024 * 1024
+ROSTER_SUFFIXES = {'.xlsx': 'xlsx', '.csv': 'csv'}
+
+
+def read_roster_zip(source):
+    """
+    [(file_name, file_type, content)] of every .xlsx/.csv member of a zip,
+    skipping folders and macOS metadata
+    """
+    with zipfile.ZipFile(source) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith('__MACOSX/')
+            and not PurePosixPath(info.filename).name.startswith(('.', '~$'))
+            and PurePosixPath(info.filename).suffix.lower() in ROSTER_SUFFIXES
+        ]
+        if sum(info.file_size for info in members) > BATCH_MAX_UNCOMPRESSED:
+            raise ValueError("File zip quá lớn sau khi giải nén")
+        return [
+            (
+                info.filename,
+                ROSTER_SUFFIXES[PurePosixPath(info.filename).suffix.lower()],
+                archive.read(info),
+            )
+            for info in members
+        ]
+
+
+def first_sheet_name(content):
+    """
+    Name of the first sheet of an xlsx file. openpyxl in read-only mode only
+    reads the workbook index here, not the cells.
+    """
+    workbook = load_workbook(io.BytesIO(content), read_only=True)
+    try:
+        return workbook.sheetnames[0] if workbook.sheetnames else None
+    finally:
+        workbook.close()
+
+
+def resolve_class_name(file_name, sheet_name, classes):
+    """Tên file (bỏ đuôi) nếu là một lớp, không thì tên sheet đầu tiên"""
+    for candidate in (PurePosixPath(file_name).stem, sheet_name):
+        if candidate and candidate.strip() in classes:
+            return candidate.strip()
+    return None
+
+
+def create_roster_jobs(source, class_names=None, created_by=None):
+    """
+    Create one pending ImportJob per roster of a zip, without parsing them.
+    class_names limits which classes may be written (the classes a teacher
+    owns); None allows all of them. A file identical to the last import of
+    its class is reported as unchanged instead of getting a job.
+    Returns (jobs, results): results has one dict per file, in archive order.
+    """
+    files = read_roster_zip(source)
+    classes = UniversityClass.objects.all()
+    if class_names is not None:
+        classes = classes.filter(class_name__in=list(class_names))
+    classes = set(classes.values_list('class_name', flat=True))
+
+    jobs, results = [], []
+    for file_name, file_type, content in files:
+        result = {'file_name': file_name, 'class_name': None}
+        results.append(result)
+        try:
+            sheet_name = first_sheet_name(content) if file_type == 'xlsx' else None
+        except Exception as e:
+            result.update(status='failed', message=f"Lỗi xử lý file: {str(e)}")
+            continue
+
+        class_name = resolve_class_name(file_name, sheet_name, classes)
+        if class_name is None:
+            result.update(status='failed', message="Không tìm thấy lớp theo tên file hoặc tên sheet")
+            continue
+        result['class_name'] = class_name
+
+        file_hash = hashlib.sha256(content).hexdigest()
+        cached = get_cached_upload(file_hash, class_name)
+        if cached is not None:
+            result.update(status='unchanged', total=cached['total'], errors=cached['errors'])
+            continue
+
+        job = ImportJob.objects.create(
+            class_name_id=class_name,
+            created_by=created_by,
+            file_name=PurePosixPath(file_name).name,
+            file_type=file_type,
+            file_hash=file_hash,
+            file_path=save_upload(content, suffix=f".{file_type}")
+        )
+        jobs.append(job)
+        result.update(status=job.status, job_id=str(job.job_id))
+    return jobs, results
+
+
+def parse_roster(file_type, path):
+    """
+    Chạy trong process con: parse một file danh sách sinh viên.
+    Trả về (students_data, error).
+    """
+    try:
+        processor = DataProcessor(path, file_type=file_type)
+        return processor.get_all_student_detail(), None
+    except Exception as e:
+        return None, f"Lỗi xử lý file: {str(e)}"
+
+
+def parse_rosters(files, workers=None):
+    """
+    Parse (file_type, path) pairs in a process pool (spawn: the web
+    process already runs import threads, forking it is unsafe). One file is
+    parsed inline.
+    """
+    if len(files) <= 1:
+        return [parse_roster(*f) for f in files]
+
+    workers = workers or getattr(settings, 'BATCH_IMPORT_PROCESSES', None) or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(files)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    ) as pool:
+        return list(pool.map(parse_roster, *zip(*files)))
@@ -0,0 +1,75 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import UniversityClass
+from .permissions import owned_class_stamp, owned_classes
+
+
+def class_version_stamp(request, class_name):
+    """
+    (version, updated_at) of a class, reused from the ownership check of the
+    request (IsClassOwner); None when the class has no ClassAggregate yet
+    """
+    stamp = owned_class_stamp(request, class_name)
+    return stamp if stamp and stamp[0] is not None else None
+
+
+def teacher_classes_stamp(teacher):
+    """Versions of every class of a teacher, from one query"""
+    return list(
+        UniversityClass.objects.filter(teacher=teacher)
+        .order_by('class_name')
+        .values_list('class_name', 'aggregate__version', 'aggregate__updated_at')
+    )
+
+
+def user_version_stamp(user):
+    """
+    (version string, last_modified) covering every class owned by user,
+    joined on teacher__user so no Teacher lookup is needed
+    """
+    rows = list(
+        owned_classes(user)
+        .order_by('class_name')
+        .values_list('class_name', 'aggregate__version', 'aggregate__updated_at')
+    )
+    modified = [updated_at for _, _, updated_at in rows if updated_at]
+    return ';'.join(f"{name}:{version}" for name, version, _ in rows), max(modified, default=None)
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag + Last-Modified cho các endpoint GET dựa trên version của lớp.
+    If-None-Match/If-Modified-Since khớp thì trả 304 trước khi chạy truy vấn
+    danh sách hay serialize.
+
+    View con cài đặt get_version_stamp() trả về (chuỗi version, last_modified)
+    hoặc None nếu không xác định được (khi đó xử lý như bình thường).
+    """
+
+    def get_version_stamp(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        stamp = self.get_version_stamp()
+        if stamp is None:
+            return super().get(request, *args, **kwargs)
+
+        version, last_modified = stamp
+        # Query string (fields, ordering, cursor...) đổi nội dung trả về nên cũng vào ETag
+        source = f"{request.user.pk}|{request.get_full_path()}|{version}"
+        etag = quote_etag(hashlib.sha256(source.encode('utf-8')).hexdigest()[:32])
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if timestamp is not None:
+                    response['Last-Modified'] = http_date(timestamp)
+        # Trình duyệt luôn hỏi lại server, dữ liệu theo từng giảng viên
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,192 @@
+import csv
+import tempfile
+
+from openpyxl import Workbook
+from rest_framework.negotiation import DefaultContentNegotiation
+
+from .models import Student, Subject_class, Subject_student
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow là tùy chọn, chỉ cần cho export parquet
+    pa = None
+
+# Số dòng lấy mỗi lần từ server-side cursor
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_READ_SIZE = 64 * 1024
+
+STUDENT_EXPORT_FIELDS = (
+    'student_id', 'student_name', 'student_gmail', 'passed_credit',
+    'score_10', 'score_4', 'score_char', 'rank', 'is_graduated',
+    'class_rank', 'class_percentile'
+)
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_CONTENT_TYPES if fmt != 'parquet' or pa is not None]
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """?format= chọn định dạng file export, không phải renderer của DRF"""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def class_subject_columns(class_name):
+    """
+    (subject_id, subject_name) of every subject of the class or with a
+    score in it, ordered by semester then subject_id
+    """
+    semesters = {}
+    for subject_id, name, semester_id in Subject_class.objects.filter(
+        class_name_id=class_name
+    ).values_list('subject_id', 'subject__subject_name', 'semester_id'):
+        semesters[subject_id] = (semester_id, name)
+    for subject_id, name in Subject_student.objects.filter(
+        student__class_name_id=class_name
+    ).exclude(subject_id__in=list(semesters)).values_list('subject_id', 'subject__subject_name').distinct():
+        semesters[subject_id] = (None, name)
+
+    ordered = sorted(semesters.items(), key=lambda item: (item[1][0] is None, item[1][0] or 0, item[0]))
+    return [(subject_id, name) for subject_id, (_, name) in ordered]
+
+
+def iter_export_rows(class_name, subject_ids):
+    """
+    One flat tuple per student: STUDENT_EXPORT_FIELDS then one score per
+    subject. Students and scores are read with two server-side cursors in
+    student_id order and merged, so only one student is held at a time.
+    """
+    students = Student.objects.filter(class_name_id=class_name).order_by('student_id') \
+        .values_list(*STUDENT_EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    scores = Subject_student.objects.filter(student__class_name_id=class_name).order_by('student_id') \
+        .values_list('student_id', 'subject_id', 'score_10').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    position = {subject_id: i for i, subject_id in enumerate(subject_ids)}
+    pending = next(scores, None)
+    for student in students:
+        student_id = student[0]
+        row_scores = [None] * len(subject_ids)
+        # Cùng thứ tự sắp của DB nên điểm của sinh viên này luôn nằm liền nhau ở đầu
+        while pending is not None and pending[0] == student_id:
+            row_scores[position[pending[1]]] = pending[2]
+            pending = next(scores, None)
+        yield student + tuple(row_scores)
+
+
+class _Echo:
+    """File-like object whose write() just returns the value (csv.writer to a generator)"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows, subject_count):
+    writer = csv.writer(_Echo())
+    # BOM để Excel nhận đúng UTF-8 (tiếng Việt)
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_xlsx(header, rows, subject_count):
+    """
+    openpyxl write-only mode keeps only the current row in memory; the zip
+    container can only be finished at the end, so the file is built in a
+    temporary file and then streamed in chunks.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Export')
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        for chunk in iter(lambda: output.read(EXPORT_READ_SIZE), b''):
+            yield chunk
+
+
+class _ByteSink:
+    """Write target for ParquetWriter; drained after each row group"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema(header, subject_count):
+    # Khai báo kiểu cố định: một khối toàn điểm trống không được suy ra kiểu null
+    student_types = [
+        pa.string(), pa.string(), pa.string(), pa.int64(),
+        pa.float64(), pa.float64(), pa.string(), pa.string(), pa.bool_(),
+        pa.int64(), pa.float64()
+    ]
+    types = student_types + [pa.float64()] * subject_count
+    return pa.schema(list(zip(header, types)))
+
+
+def stream_parquet(header, rows, subject_count):
+    """One row group per EXPORT_CHUNK_SIZE students, yielded as soon as it is written"""
+    schema = parquet_schema(header, subject_count)
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema)
+    batch = []
+
+    def write_batch():
+        columns = list(zip(*batch)) if batch else [()] * len(header)
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+            schema=schema
+        ))
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= EXPORT_CHUNK_SIZE:
+            write_batch()
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch()
+    writer.close()
+    yield sink.drain()
+
+
+EXPORT_WRITERS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+    'parquet': stream_parquet,
+}
+
+
+def export_class(class_name, file_format):
+    """Generator of the encoded export file of a class"""
+    subjects = class_subject_columns(class_name)
+    # Mã môn trong tiêu đề để hai môn trùng tên vẫn là hai cột khác nhau
+    header = list(STUDENT_EXPORT_FIELDS) + [f"{name} ({subject_id})" for subject_id, name in subjects]
+    rows = iter_export_rows(class_name, [subject_id for subject_id, _ in subjects])
+    return EXPORT_WRITERS[file_format](header, rows, len(subjects))
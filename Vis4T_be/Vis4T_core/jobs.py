@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import ImportJob
+from .batch import parse_roster, parse_rosters
+from .utils import bulk_upsert_students, current_class_version, prune_import_jobs, remove_upload
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_last_recovery = None
+
+
+def get_executor():
+    """
+    Thread pool xử lý import trong chính process web, không cần broker.
+    Lần đầu khởi tạo sẽ nhận lại các job còn dang dở trước khi restart.
+    """
+    global _executor
+    with _executor_lock:
+        created = _executor is None
+        if created:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORT_JOB_WORKERS', 2),
+                thread_name_prefix='import-job'
+            )
+    if created:
+        recover_jobs(force=True)
+    return _executor
+
+
+def recover_jobs(force=False):
+    """
+    Submit pending and stale jobs to this process, at most once every
+    IMPORT_JOB_RECOVERY_SECONDS. Called on start-up and while jobs are
+    polled, so a job whose worker died after this process started is still
+    picked up once its heartbeat goes stale. Jobs submitted twice are
+    harmless: only one worker wins claim_job().
+    """
+    global _last_recovery
+    interval = getattr(settings, 'IMPORT_JOB_RECOVERY_SECONDS', 60)
+    now = time.monotonic()
+    with _executor_lock:
+        if not force and _last_recovery is not None and now - _last_recovery < interval:
+            return
+        _last_recovery = now
+        executor = _executor
+    if executor is None:
+        # get_executor() tự quét lại khi khởi tạo
+        get_executor()
+        return
+    for job_id in recoverable_job_ids():
+        executor.submit(run_import_job, job_id)
+
+
+def recoverable_job_ids():
+    """Pending jobs plus running jobs whose worker stopped reporting"""
+    stale_before = timezone.now() - timedelta(
+        seconds=getattr(settings, 'IMPORT_JOB_STALE_SECONDS', 900)
+    )
+    stale = ImportJob.objects.filter(status='running', updated_at__lt=stale_before)
+    stale_ids = list(stale.values_list('job_id', flat=True))
+    if stale_ids:
+        # Job ghi lâu trong một transaction chỉ báo heartbeat qua cache
+        alive = cache.get_many([progress_cache_key(job_id) for job_id in stale_ids])
+        stale_ids = [job_id for job_id in stale_ids if progress_cache_key(job_id) not in alive]
+        ImportJob.objects.filter(job_id__in=stale_ids, status='running').update(
+            status='pending', updated_at=timezone.now()
+        )
+    return list(
+        ImportJob.objects.filter(status='pending')
+        .order_by('created_at')
+        .values_list('job_id', flat=True)
+    )
+
+
+def enqueue_import(job):
+    """Submit the job once the transaction that created it has committed"""
+    transaction.on_commit(lambda: get_executor().submit(run_import_job, job.job_id))
+
+
+def enqueue_import_batch(jobs):
+    """Submit several jobs as one batch once their transaction has committed"""
+    job_ids = [job.job_id for job in jobs]
+    transaction.on_commit(lambda: get_executor().submit(run_import_batch, job_ids))
+
+
+def progress_cache_key(job_id):
+    return f"import-progress:{job_id}"
+
+
+def report_progress(job_id, processed):
+    """
+    Lưu số dòng đã ghi sau mỗi batch vào cache, không qua DB: các batch được
+    ghi trong cùng một transaction nên một UPDATE ở đây sẽ không ai thấy cho
+    tới khi commit. Key còn sống cũng là heartbeat, recoverable_job_ids() sẽ
+    không coi job là treo.
+    """
+    cache.set(
+        progress_cache_key(job_id), processed,
+        timeout=getattr(settings, 'IMPORT_JOB_STALE_SECONDS', 900)
+    )
+
+
+def job_progress(job):
+    """Number of rows written so far, including batches not yet committed"""
+    if job.status != 'running':
+        return job.processed
+    return cache.get(progress_cache_key(job.job_id), job.processed)
+
+
+def claim_job(job_id):
+    """
+    Mark a pending job as running and return it. Only one worker wins a job
+    (even when several processes recover it); the others get None.
+    """
+    now = timezone.now()
+    claimed = ImportJob.objects.filter(job_id=job_id, status='pending').update(
+        status='running', started_at=now, updated_at=now
+    )
+    if not claimed:
+        return None
+    return ImportJob.objects.select_related('class_name').get(job_id=job_id)
+
+
+def complete_job(job, students_data, error=None):
+    """
+    Write the parsed roster of a claimed job and record the outcome.
+    error is the parse failure message when the file could not be read.
+    """
+    if error is None and students_data.empty:
+        error = "File không chứa dữ liệu hợp lệ"
+
+    if error is None:
+        try:
+            job.total = len(students_data)
+            job.save(update_fields=['total', 'updated_at'])
+
+            created_count, updated_count, errors = bulk_upsert_students(
+                job.class_name, students_data, progress=lambda done: report_progress(job.job_id, done)
+            )
+
+            # Upload lại cùng file khi lớp còn ở version này sẽ là "không thay đổi"
+            job.class_version = current_class_version(job.class_name_id)
+            job.status = 'completed'
+            job.message = 'Upload thành công'
+            job.processed = job.total
+            job.created = created_count
+            job.updated = updated_count
+            job.errors = errors
+        except Exception as e:
+            logger.exception("Import job %s failed", job.job_id)
+            error = f"Lỗi xử lý file: {str(e)}"
+
+    if error is not None:
+        job.status = 'failed'
+        job.message = error
+    job.finished_at = timezone.now()
+    # Không cần giữ file sau khi đã xử lý xong
+    remove_upload(job.file_path)
+    job.file_path = ''
+    job.save()
+    cache.delete(progress_cache_key(job.job_id))
+    prune_import_jobs(job.class_name_id)
+
+
+def run_import_job(job_id):
+    close_old_connections()
+    try:
+        job = claim_job(job_id)
+        if job is None:
+            return
+        complete_job(job, *parse_roster(job.file_type, job.file_path))
+    finally:
+        connection.close()
+
+
+def run_import_batch(job_ids, workers=None):
+    """
+    Import several jobs at once: the files are parsed in parallel in a
+    process pool, then written one by one like run_import_job. Each job is
+    claimed only once its file is parsed, right before it is written, so a
+    long parse never leaves claimed jobs without a heartbeat; a job another
+    worker recovered in the meantime is skipped.
+    """
+    close_old_connections()
+    try:
+        jobs = list(ImportJob.objects.filter(job_id__in=job_ids, status='pending').order_by('created_at'))
+        try:
+            parsed = parse_rosters([(job.file_type, job.file_path) for job in jobs], workers)
+        except Exception as e:
+            logger.exception("Parsing import batch failed")
+            parsed = [(None, f"Lỗi xử lý file: {str(e)}")] * len(jobs)
+        for job, (students_data, error) in zip(jobs, parsed):
+            job = claim_job(job.job_id)
+            if job is not None:
+                complete_job(job, students_data, error)
+    finally:
+        connection.close()
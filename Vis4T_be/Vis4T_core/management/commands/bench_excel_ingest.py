@@ -0,0 +1,131 @@
+import random
+import tempfile
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from openpyxl import Workbook
+from unidecode import unidecode
+
+from Vis4T_core.utils import DEFAULT_HEADER_ROW, EXCEL_ENGINE, FOOTER_ROWS, DataProcessor
+
+SCORE_CHARS = ['A', 'B+', 'B', 'C+', 'C', 'D+', 'D']
+RANKS = ['Xuất sắc', 'Giỏi', 'Khá', 'Trung bình']
+SUMMARY_COLUMNS = ['Số TC', 'Điểm TB hệ 10', 'Điểm TB hệ 4', 'Điểm chữ', 'Xếp loại']
+# Điểm rèn luyện ở cuối file, bị bỏ khi đọc (pandas đặt tên 'Điểm', 'Xếp loại.1')
+CONDUCT_COLUMNS = ['Điểm', 'Xếp loại']
+
+
+def export_layout(body, subjects, group_row=True):
+    """
+    Wrap student rows (STT, Mã SV, Họ đệm, Tên, one score per subject, the
+    SUMMARY_COLUMNS and CONDUCT_COLUMNS values) in the layout of the school
+    export: title rows, an optional row of merged group headers holding the
+    identity labels, the header row whose first 4 cells are blank (pandas
+    names them 'Unnamed: 0..3'), and 2 footer rows.
+    """
+    rows = [['TRƯỜNG ĐẠI HỌC CÔNG NGHIỆP TP.HCM'], [None, 'BẢNG ĐIỂM TỔNG HỢP']]
+    rows += [[] for _ in range(DEFAULT_HEADER_ROW - 3)]
+    if group_row:
+        rows.append(
+            ['STT', 'Mã SV', 'Họ đệm', 'Tên', 'Học kỳ 1'] + [None] * (len(subjects) - 1)
+            + ['Kết quả học tập'] + [None] * (len(SUMMARY_COLUMNS) - 1)
+            + ['Rèn luyện'] + [None] * (len(CONDUCT_COLUMNS) - 1)
+        )
+    else:
+        rows.append([])
+    rows.append([None] * 4 + list(subjects) + SUMMARY_COLUMNS + CONDUCT_COLUMNS)
+    rows += [list(row) for row in body]
+    rows += [['Tổng số sinh viên', len(body)], ['Ngày xuất', '01/01/2025']]
+    return rows
+
+
+def random_body(rows, subject_columns, seed=0):
+    rng = random.Random(seed)
+    body = []
+    for i in range(rows):
+        score_10 = round(rng.uniform(4, 10), 2)
+        body.append(
+            [i + 1, 20000000 + i, 'Nguyễn Văn', f"Tên{i}"]
+            + [round(rng.uniform(0, 10), 1) for _ in range(subject_columns)]
+            + [rng.randint(0, 156), score_10, round(score_10 * 0.4, 2), rng.choice(SCORE_CHARS), rng.choice(RANKS)]
+            + [rng.randint(50, 100), rng.choice(RANKS)]
+        )
+    return body
+
+
+def build_export(path, rows, subject_columns, group_row=True, seed=0):
+    """Synthetic school export (see export_layout) saved as xlsx"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    subjects = [f"Môn {i + 1}" for i in range(subject_columns)]
+    for row in export_layout(random_body(rows, subject_columns, seed), subjects, group_row):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def read_baseline(source, file_type):
+    """
+    The roster reader before the fast ingest and vectorized e-mails: fixed
+    skiprows/skipfooter, columns renamed from their 'Unnamed: i' labels and
+    e-mails built row by row. Kept as the reference for parity checks.
+    """
+    if file_type == 'xlsx':
+        df = pd.read_excel(source, skiprows=DEFAULT_HEADER_ROW, skipfooter=FOOTER_ROWS)
+    else:
+        df = pd.read_csv(source, skiprows=DEFAULT_HEADER_ROW, skipfooter=FOOTER_ROWS, engine='python')
+    df = df.drop(columns=[col for col in ('Unnamed: 0', 'Điểm', 'Xếp loại.1') if col in df.columns])
+    df = df.drop(columns=df.columns[3:-5])
+    df = df.rename(columns={'Unnamed: 1': 'student_id', 'Unnamed: 2': 'first_name', 'Unnamed: 3': 'last_name'})
+    df['student_id'] = df['student_id'].astype('int')
+    df['student_name'] = df['first_name'] + ' ' + df['last_name']
+    df['student_gmail'] = df.apply(
+        lambda x: f"{unidecode(str(x['last_name']).lower())}.{x['student_id']}@iuh.edu.vn", axis=1
+    )
+    df = df.drop(columns=['first_name', 'last_name'])
+    df.columns = ['student_id', 'passed_credit', 'score_10', 'score_4', 'score_char', 'rank', 'student_name', 'student_gmail']
+    return df
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the original roster reader with the fixed-layout openpyxl read "
+        "of DataProcessor and its fast ingest mode (header detection, column "
+        "projection, calamine if installed)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help='Existing .xlsx export; a synthetic one is generated otherwise')
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--subject-columns', type=int, default=40)
+        parser.add_argument('--no-group-row', action='store_true', help='Generate the export without the group header row')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with tempfile.NamedTemporaryFile(suffix='.xlsx') as tmp:
+            path = options['file']
+            if not path:
+                self.stdout.write(f"Generating {options['rows']} rows x {options['subject_columns']} subjects...")
+                build_export(tmp.name, options['rows'], options['subject_columns'],
+                             group_row=not options['no_group_row'])
+                path = tmp.name
+
+            results = {}
+            for label, read in (
+                ('baseline', lambda: read_baseline(path, 'xlsx')),
+                ('openpyxl, skiprows=9', lambda: DataProcessor(path, file_type='xlsx', fast=False).get_all_student_detail()),
+                (f'fast ({EXCEL_ENGINE})', lambda: DataProcessor(path, file_type='xlsx').get_all_student_detail()),
+            ):
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    students = read()
+                    timings.append(time.perf_counter() - start)
+                results[label] = students
+                self.stdout.write(f"  {label:<24} best {min(timings):8.3f}s  ({len(students)} students)")
+
+        baseline = results.pop('baseline')
+        for label, students in results.items():
+            if not baseline.equals(students):
+                raise CommandError(f"{label} produced different student rows than the baseline reader")
+        self.stdout.write(self.style.SUCCESS("All readers produced identical student rows"))
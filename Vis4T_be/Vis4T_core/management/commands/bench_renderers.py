@@ -0,0 +1,49 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from Vis4T_core.management.commands.bench_serializers import build_students
+from Vis4T_core.renderers import FastJSONRenderer, orjson
+from Vis4T_core.serializers import StudentRowSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer with FastJSONRenderer on the payload of "
+        "a class student list"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson chưa được cài, FastJSONRenderer dùng json của stdlib"))
+
+        _, values = build_students(options['rows'])
+        # Cùng dạng với response của /api/classes/<class_name>/students/?page_size=...
+        payload = {
+            'next': None,
+            'previous': None,
+            'results': StudentRowSerializer().serialize_many(values),
+        }
+
+        results = {}
+        self.stdout.write(f"{options['rows']} students")
+        for label, renderer in (('JSONRenderer', JSONRenderer()), ('FastJSONRenderer', FastJSONRenderer())):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                results[label] = renderer.render(payload)
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(
+                f"  {label:<18} best {min(timings):8.3f}s   {len(results[label]) / 1024:8.0f} KiB"
+            )
+
+        old, new = (json.loads(body) for body in results.values())
+        if old != new:
+            raise CommandError("FastJSONRenderer produced different JSON")
+        self.stdout.write(self.style.SUCCESS("Both produced the same JSON"))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from Vis4T_core.models import Student, UniversityClass
+from Vis4T_core.serializers import StudentRowSerializer, StudentSerializer
+
+
+def build_students(rows):
+    """In-memory students of one class, and the same rows as .values() dicts"""
+    university_class = UniversityClass(class_name='BENCH-SERIALIZER', total_credit=156, total_semester=9)
+    students = []
+    for i in range(rows):
+        score_10 = 4 + (i % 60) / 10
+        students.append(Student(
+            student_id=str(90000000 + i), class_name=university_class,
+            student_name=f"Nguyễn Văn Tên{i}", student_gmail=f"ten{i}.{90000000 + i}@iuh.edu.vn",
+            passed_credit=i % 157, score_10=score_10, score_4=round(score_10 * 0.4, 2),
+            score_char='B', is_graduated=False, rank='Khá',
+            class_rank=i + 1, class_dense_rank=i + 1, class_percentile=round(1 - i / rows, 4)
+        ))
+    columns = StudentRowSerializer().columns
+    values = [{column: getattr(student, column) for column in columns} for student in students]
+    return students, values
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare StudentSerializer(many=True) with StudentRowSerializer on the "
+        "same in-memory class, without touching the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        students, values = build_students(options['rows'])
+        results = {}
+        self.stdout.write(f"{len(students)} rows")
+        for label, func in (
+            ('StudentSerializer', lambda: StudentSerializer(students, many=True).data),
+            ('StudentRowSerializer', lambda: StudentRowSerializer().serialize_many(values)),
+        ):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                results[label] = func()
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(f"  {label:<22} best {min(timings):8.3f}s")
+
+        old, new = (JSONRenderer().render(data) for data in results.values())
+        if old != new:
+            raise CommandError("StudentRowSerializer produced different JSON")
+        self.stdout.write(self.style.SUCCESS("Both produced identical JSON"))
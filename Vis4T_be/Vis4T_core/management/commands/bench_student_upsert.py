@@ -0,0 +1,95 @@
+import random
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Vis4T_core.models import Student, Teacher, UniversityClass
+from Vis4T_core.utils import bulk_upsert_students
+
+BENCH_TEACHER_ID = 'bench-teacher'
+BENCH_CLASS_NAME = 'BENCH-UPSERT'
+SCORE_CHARS = ['A', 'B+', 'B', 'C+', 'C', 'D+', 'D']
+
+
+class Rollback(Exception):
+    pass
+
+
+def build_roster(rows, seed=0):
+    """Synthetic roster in the shape returned by get_all_student_detail()"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(rows):
+        score_10 = round(rng.uniform(4, 10), 2)
+        data.append({
+            'student_id': 90000000 + i,
+            'passed_credit': rng.randint(0, 156),
+            'score_10': score_10,
+            'score_4': round(score_10 * 0.4, 2),
+            'score_char': rng.choice(SCORE_CHARS),
+            'rank': 'Khá',
+            'student_name': f"Nguyễn Văn Tên{i}",
+            'student_gmail': f"ten{i}.{90000000 + i}@iuh.edu.vn",
+        })
+    return pd.DataFrame(data)
+
+
+def per_row_upsert(university_class, students_data):
+    """Đường cũ của UploadStudentsView: một update_or_create cho mỗi dòng"""
+    for _, row in students_data.iterrows():
+        student_data = {
+            'student_id': str(row['student_id']),
+            'class_name': university_class,
+            'student_name': row['student_name'],
+            'student_gmail': row['student_gmail'],
+            'passed_credit': int(row['passed_credit']),
+            'score_10': float(row['score_10']),
+            'score_4': float(row['score_4']),
+            'score_char': row['score_char'],
+        }
+        Student.objects.update_or_create(student_id=student_data['student_id'], defaults=student_data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time per-row update_or_create against bulk_upsert_students on the same "
+        "synthetic roster, for a fresh import and a re-import. Every run is "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        students_data = build_roster(options['rows'])
+        self.stdout.write(f"{len(students_data)} rows")
+        for label, upsert in (
+            ('update_or_create', per_row_upsert),
+            ('bulk_upsert_students', bulk_upsert_students),
+        ):
+            insert, reimport = self.run(upsert, students_data)
+            self.stdout.write(f"  {label:<22} insert {insert:8.3f}s   re-import {reimport:8.3f}s")
+
+    def run(self, upsert, students_data):
+        timings = []
+        try:
+            with transaction.atomic():
+                teacher = Teacher.objects.create(
+                    teacher_id=BENCH_TEACHER_ID, email='bench@example.com', password='',
+                    teacher_fullname='Benchmark', year_of_birth=1990, academic_title='',
+                    major='', gender='O', phone_number=''
+                )
+                university_class = UniversityClass.objects.create(
+                    class_name=BENCH_CLASS_NAME, teacher=teacher, class_major='Benchmark',
+                    total_credit=156, total_semester=9
+                )
+                for _ in range(2):
+                    start = time.perf_counter()
+                    upsert(university_class, students_data)
+                    timings.append(time.perf_counter() - start)
+                raise Rollback
+        except Rollback:
+            pass
+        return timings
@@ -0,0 +1,63 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Vis4T_core.models import Subject
+from Vis4T_core.subject_matcher import SubjectMatcher
+
+
+def linear_match(name, subjects):
+    # Cách khớp cũ của init_db.py: quét tuần tự, lấy kết quả đầu tiên
+    name = name.strip().lower()
+    for subject_name, subject_id in subjects.items():
+        if name == subject_name or name in subject_name or subject_name in name:
+            return subject_id
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark SubjectMatcher against the old linear substring scan on "
+        "synthetic transcript rows built from the seeded subjects"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Number of transcript rows')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        subjects = list(Subject.objects.values_list('subject_id', 'subject_name'))
+        if not subjects:
+            raise CommandError("Database chưa có môn học, hãy chạy seed_db trước")
+
+        rng = random.Random(options['seed'])
+        # Biến thể thường gặp trong bảng điểm: khác hoa thường, thiếu dấu, thêm khoảng trắng
+        variants = [
+            lambda n: n,
+            lambda n: n.upper(),
+            lambda n: f"  {n} ",
+            lambda n: n.lower().replace('à', 'a').replace('á', 'a').replace('ọ', 'o'),
+        ]
+        names = [rng.choice(variants)(rng.choice(subjects)[1]) for _ in range(options['rows'])]
+
+        start = time.perf_counter()
+        lookup = {name.strip().lower(): subject_id for subject_id, name in subjects}
+        linear = [linear_match(name, lookup) for name in names]
+        linear_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = SubjectMatcher(subjects)
+        build_elapsed = time.perf_counter() - start
+        indexed = [matcher.match(name) for name in names]
+        indexed_elapsed = time.perf_counter() - start
+
+        self.stdout.write(f"{len(names)} rows, {len(subjects)} subjects")
+        self.stdout.write(
+            f"  linear scan: {linear_elapsed:8.3f}s, "
+            f"{sum(r is not None for r in linear)} matched"
+        )
+        self.stdout.write(
+            f"  indexed:     {indexed_elapsed:8.3f}s (build {build_elapsed:.3f}s), "
+            f"{sum(r is not None for r in indexed)} matched"
+        )
@@ -0,0 +1,61 @@
+import random
+import time
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from unidecode import unidecode
+
+from Vis4T_core.utils import transliterate_column, transliterate_lower
+
+LAST_NAMES = [
+    'Anh', 'Bảo', 'Châu', 'Dũng', 'Đức', 'Giang', 'Hà', 'Hải', 'Hạnh', 'Hiếu',
+    'Hoàng', 'Hùng', 'Hương', 'Khánh', 'Linh', 'Long', 'Mai', 'Minh', 'Nam', 'Ngọc',
+    'Nhung', 'Phong', 'Phúc', 'Quân', 'Quỳnh', 'Sơn', 'Tâm', 'Thảo', 'Thịnh', 'Trang',
+    'Trí', 'Trung', 'Tú', 'Tuấn', 'Uyên', 'Vân', 'Việt', 'Vy', 'Xuân', 'Yến',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the old per-row DataFrame.apply(unidecode) e-mail building with "
+        "transliterate_column on a synthetic roster"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        df = pd.DataFrame({
+            'student_id': range(20000000, 20000000 + options['rows']),
+            'last_name': [rng.choice(LAST_NAMES) for _ in range(options['rows'])],
+        })
+
+        def per_row():
+            return df.apply(
+                lambda x: f"{unidecode(str(x['last_name']).lower())}.{x['student_id']}@iuh.edu.vn", axis=1
+            )
+
+        def vectorized():
+            # Xóa cache để mỗi lần đo đều tính lại từ đầu
+            transliterate_lower.cache_clear()
+            return (
+                transliterate_column(df['last_name'].astype(str))
+                + '.' + df['student_id'].astype(str) + '@iuh.edu.vn'
+            )
+
+        results = {}
+        self.stdout.write(f"{options['rows']} rows")
+        for label, func in (('DataFrame.apply', per_row), ('transliterate_column', vectorized)):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                results[label] = func()
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(f"  {label:<22} best {min(timings):8.3f}s")
+
+        old, new = results.values()
+        if not old.equals(new):
+            raise CommandError("transliterate_column produced different e-mails")
+        self.stdout.write(self.style.SUCCESS("Both produced identical e-mails"))
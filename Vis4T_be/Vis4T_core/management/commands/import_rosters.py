@@ -0,0 +1,57 @@
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Vis4T_core.batch import create_roster_jobs
+from Vis4T_core.jobs import run_import_batch
+from Vis4T_core.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a zip of roster files (.xlsx/.csv), one class per file named "
+        "after the class or its first sheet, parsing in a process pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('zip_path', help='Zip file containing the roster files')
+        parser.add_argument('--workers', type=int, help='Number of parsing processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            jobs, results = create_roster_jobs(options['zip_path'])
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['zip_path']}")
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise CommandError(str(e))
+
+        # Cùng đường xử lý với upload qua API, nhưng chạy ngay trong command
+        run_import_batch([job.job_id for job in jobs], workers=options['workers'])
+        finished = {
+            str(job.job_id): job
+            for job in ImportJob.objects.filter(job_id__in=[job.job_id for job in jobs])
+        }
+
+        failed = 0
+        for result in results:
+            job = finished.get(result.get('job_id'))
+            if job is not None:
+                result.update(status=job.status, message=job.message, created=job.created,
+                              updated=job.updated, errors=job.errors)
+            if result['status'] == 'completed':
+                self.stdout.write(
+                    f"  {result['file_name']} -> {result['class_name']}: "
+                    f"{result['created']} created, {result['updated']} updated"
+                )
+                for error in result['errors']:
+                    self.stdout.write(self.style.WARNING(f"    {error}"))
+            elif result['status'] == 'unchanged':
+                self.stdout.write(f"  {result['file_name']} -> {result['class_name']}: unchanged")
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"  {result['file_name']}: {result['message']}"))
+
+        summary = f"{len(results) - failed}/{len(results)} files imported in {time.perf_counter() - start:.2f}s"
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(summary))
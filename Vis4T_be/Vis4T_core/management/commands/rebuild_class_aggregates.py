@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from Vis4T_core.aggregates import rebuild_class_aggregates
+from Vis4T_core.ranking import rank_classes
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-class ClassAggregate table and class ranks from the student table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('class_names', nargs='*', help='Only rebuild these classes')
+
+    def handle(self, *args, **options):
+        count = rebuild_class_aggregates(options['class_names'] or None)
+        rank_classes(options['class_names'] or None)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt aggregates and ranks for {count} classes"))
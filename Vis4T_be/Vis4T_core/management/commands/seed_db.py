@@ -0,0 +1,247 @@
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from Vis4T_core.aggregates import rebuild_class_aggregates
+from Vis4T_core.ranking import rank_classes
+from Vis4T_core.models import (
+    Student, Subject, Subject_class, Subject_student, Teacher, UniversityClass
+)
+from Vis4T_core.subject_matcher import SubjectMatcher
+
+TEACHERS = [
+    {
+        'teacher_id': 'test',
+        'email': 'test@gmail.com',
+        'password': 'test',
+        'teacher_fullname': 'Võ Văn A',
+        'year_of_birth': 1979,
+        'academic_title': 'Thạc sĩ',
+        'major': 'Khoa học máy tính',
+        'gender': 'M',
+        'phone_number': '12345678',
+    },
+    # Giữ teacher test2 để sau này có thể dùng cho các lớp khác
+    {
+        'teacher_id': 'test2',
+        'email': 'test2@gmail.com',
+        'password': 'test2',
+        'teacher_fullname': 'Nguyễn Hữu Tình',
+        'year_of_birth': 1970,
+        'academic_title': 'Thạc sĩ',
+        'major': 'Công nghệ thông tin',
+        'gender': 'M',
+        'phone_number': '234567891',
+    },
+]
+
+CLASSES = [
+    {'class_name': 'KHDL16A', 'teacher_id': 'test', 'class_major': 'Khoa Học Dữ Liệu',
+     'total_semester': 9, 'total_credit': 156},
+    {'class_name': 'KHDL15A', 'teacher_id': 'test2', 'class_major': 'Khoa Học Dữ Liệu',
+     'total_semester': 8, 'total_credit': 146},
+    {'class_name': 'KHMT13A', 'teacher_id': 'test2', 'class_major': 'Khoa Học Máy Tính',
+     'total_semester': 8, 'total_credit': 148},
+    {'class_name': 'KHMT14A', 'teacher_id': 'test', 'class_major': 'Khoa Học Máy Tính',
+     'total_semester': 8, 'total_credit': 128, 'number_of_student': 72, 'is_active': False},
+]
+
+# Lớp có file điểm theo môn <class>_score.json
+SCORE_CLASSES = ['KHMT13A', 'KHDL16A', 'KHDL15A']
+
+STUDENT_FIELDS = ['student_name', 'student_gmail', 'passed_credit', 'score_10', 'score_4', 'score_char', 'rank']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed teachers, classes, students, subjects and scores from the JSON "
+        "files in one transaction, using set-based diffs and bulk_create"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir', default=str(Path(settings.BASE_DIR) / 'data'),
+            help='Directory containing the seed JSON files'
+        )
+
+    def handle(self, *args, **options):
+        self.data_dir = Path(options['data_dir'])
+        if not self.data_dir.is_dir():
+            raise CommandError(f"Data directory not found: {self.data_dir}")
+
+        self.timings = []
+        started = time.perf_counter()
+
+        data = self.stage('Load JSON files', self.load_files)
+        with transaction.atomic():
+            self.stage('Teachers', self.seed_teachers)
+            self.stage('Classes', self.seed_classes)
+            self.stage('Students', self.seed_students, data['students'])
+            self.stage('Subjects', self.seed_subjects, data['subjects'])
+            self.stage('Subject classes', self.seed_subject_classes, data['subject_classes'])
+            self.stage('Scores', self.seed_scores, data['scores'])
+            self.stage('Class aggregates', rebuild_class_aggregates, [c['class_name'] for c in CLASSES])
+            self.stage('Class ranks', rank_classes, [c['class_name'] for c in CLASSES])
+
+        self.stdout.write('\nTiming report:')
+        for name, elapsed in self.timings:
+            self.stdout.write(f"  {name:<20} {elapsed:8.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"  {'Total':<20} {time.perf_counter() - started:8.2f}s"))
+
+    def stage(self, name, func, *args):
+        self.stdout.write(f"{name}...")
+        start = time.perf_counter()
+        result = func(*args)
+        self.timings.append((name, time.perf_counter() - start))
+        return result
+
+    def read_json(self, name, required=True):
+        path = self.data_dir / name
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            if required:
+                raise CommandError(f"Missing seed file: {path}")
+            self.stdout.write(self.style.WARNING(f"  {name} not found, skipping..."))
+        except json.JSONDecodeError as e:
+            if required:
+                raise CommandError(f"{path}: {e}")
+            self.stdout.write(self.style.WARNING(f"  Invalid JSON in {name} ({e}), skipping..."))
+        return None
+
+    def load_files(self):
+        """Đọc toàn bộ file JSON trước khi mở transaction"""
+        return {
+            'students': {c['class_name']: self.read_json(f"{c['class_name']}.json") for c in CLASSES},
+            'subjects': self.read_json('subjects.json'),
+            'subject_classes': self.read_json('subjects_class.json'),
+            'scores': {name: self.read_json(f"{name}_score.json", required=False) for name in SCORE_CLASSES},
+        }
+
+    def report(self, label, created, total):
+        self.stdout.write(f"  {label}: {created} created, {total - created} already existed")
+
+    def seed_teachers(self):
+        existing = set(Teacher.objects.filter(
+            teacher_id__in=[t['teacher_id'] for t in TEACHERS]
+        ).values_list('teacher_id', flat=True))
+        new_teachers = [
+            Teacher(**dict(t, password=make_password(t['password'])))
+            for t in TEACHERS if t['teacher_id'] not in existing
+        ]
+        Teacher.objects.bulk_create(new_teachers)
+        self.report('teachers', len(new_teachers), len(TEACHERS))
+
+    def seed_classes(self):
+        existing = set(UniversityClass.objects.filter(
+            class_name__in=[c['class_name'] for c in CLASSES]
+        ).values_list('class_name', flat=True))
+        new_classes = [UniversityClass(**c) for c in CLASSES if c['class_name'] not in existing]
+        UniversityClass.objects.bulk_create(new_classes)
+        self.report('classes', len(new_classes), len(CLASSES))
+
+    def seed_students(self, students_by_class):
+        rows = [
+            (class_name, item)
+            for class_name, items in students_by_class.items()
+            for item in items
+        ]
+        existing = set(Student.objects.filter(
+            student_id__in=[item['student_id'] for _, item in rows]
+        ).values_list('student_id', flat=True))
+
+        new_students = {}
+        for class_name, item in rows:
+            if item['student_id'] in existing or item['student_id'] in new_students:
+                continue
+            new_students[item['student_id']] = Student(
+                student_id=item['student_id'],
+                class_name_id=class_name,
+                **{field: item[field] for field in STUDENT_FIELDS}
+            )
+        Student.objects.bulk_create(new_students.values(), batch_size=1000)
+        self.report('students', len(new_students), len(rows))
+
+    def seed_subjects(self, subjects_data):
+        existing = set(Subject.objects.values_list('subject_id', flat=True))
+        new_subjects = {}
+        for k in subjects_data:
+            if k['name_code'] not in existing and k['name_code'] not in new_subjects:
+                new_subjects[k['name_code']] = Subject(
+                    subject_id=k['name_code'],
+                    subject_name=k['name'].strip(),
+                    credit=k['credit'],
+                )
+        Subject.objects.bulk_create(new_subjects.values(), batch_size=1000)
+        self.report('subjects', len(new_subjects), len(subjects_data))
+
+    def seed_subject_classes(self, subject_class_data):
+        class_names = set(UniversityClass.objects.filter(
+            class_name__in=list(subject_class_data)
+        ).values_list('class_name', flat=True))
+        subject_ids = set(Subject.objects.values_list('subject_id', flat=True))
+        existing = set(Subject_class.objects.filter(
+            class_name_id__in=class_names
+        ).values_list('class_name_id', 'subject_id'))
+
+        new_rows = {}
+        total = 0
+        for class_name, items in subject_class_data.items():
+            if class_name not in class_names:
+                self.stdout.write(f"  Class {class_name} not found, skipping subjects for this class...")
+                continue
+            for i in items:
+                total += 1
+                key = (class_name, i['name_code'])
+                if i['name_code'] not in subject_ids:
+                    self.stdout.write(self.style.WARNING(f"  Subject {i['name_code']} not found, skipping..."))
+                elif key not in existing and key not in new_rows:
+                    new_rows[key] = Subject_class(
+                        class_name_id=class_name, subject_id=i['name_code'], semester_id=i['semester_id']
+                    )
+        Subject_class.objects.bulk_create(new_rows.values(), batch_size=1000)
+        self.report('subject classes', len(new_rows), total)
+
+    def seed_scores(self, scores_by_class):
+        matcher = SubjectMatcher.from_db()
+        class_subjects = SubjectMatcher.class_subject_ids(scores_by_class)
+        students = dict(Student.objects.filter(
+            class_name_id__in=list(scores_by_class)
+        ).values_list('student_id', 'class_name_id'))
+        existing = set(Subject_student.objects.filter(
+            student__class_name_id__in=list(scores_by_class)
+        ).values_list('student_id', 'subject_id'))
+
+        new_rows = {}
+        for class_name, score_data in scores_by_class.items():
+            if not score_data:
+                continue
+            preferred = class_subjects.get(class_name, frozenset())
+            queued_before = len(new_rows)
+            for student_id, subjects_data in score_data.items():
+                if students.get(student_id) != class_name:
+                    self.stdout.write(f"  Student {student_id} not found in class {class_name}, skipping...")
+                    continue
+                for subject_data in subjects_data:
+                    score = subject_data.get('score_10', -1)
+                    if score < 0:
+                        continue
+                    subject_name = subject_data['subject_name'].strip()
+                    subject_id = matcher.match(subject_name, preferred)
+                    if subject_id is None:
+                        self.stdout.write(f"  Subject not found for: {subject_name}")
+                        continue
+                    key = (student_id, subject_id)
+                    if key not in existing and key not in new_rows:
+                        new_rows[key] = Subject_student(
+                            student_id=student_id, subject_id=subject_id, score_10=float(score)
+                        )
+            self.stdout.write(f"  {class_name}: {len(new_rows) - queued_before} score rows queued")
+        Subject_student.objects.bulk_create(new_rows.values(), batch_size=1000, ignore_conflicts=True)
+        self.stdout.write(f"  scores: {len(new_rows)} created")
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+import uuid
 
 # Create your models here.
 
@@ -15,7 +16,8 @@ class User(AbstractUser):
 
 class Teacher(models.Model):
     teacher_id = models.CharField(max_length=20, unique=True, primary_key=True)
-    email = models.EmailField()
+    user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='teacher')
+    email = models.EmailField(db_index=True)
     password = models.CharField(max_length=255)
     teacher_fullname = models.CharField(max_length=50)
     year_of_birth = models.IntegerField()
@@ -36,7 +38,8 @@ class Teacher(models.Model):
         return f"Teacher: {self.teacher_fullname}"
 
 class UniversityClass(models.Model):
-    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='classes')
+    # Index (teacher, class_name) bên dưới thay cho index mặc định của FK
+    teacher = models.ForeignKey(Teacher, on_delete=models.CASCADE, related_name='classes', db_index=False)
     class_name = models.CharField(max_length=255, unique=True, primary_key=True)
     number_of_student = models.IntegerField(default=0)
     class_major = models.CharField(max_length=30)
@@ -54,6 +57,10 @@ class UniversityClass(models.Model):
         db_table = 'university_class'
         ordering = ['class_name']
         verbose_name_plural = 'Classes'
+        indexes = [
+            # Danh sách lớp của giảng viên, đã sắp theo class_name
+            models.Index(fields=['teacher', 'class_name'], name='class_teacher_name_idx'),
+        ]
 
     def __str__(self):
         return f"{self.class_name} - {self.class_major}"
@@ -71,7 +78,8 @@ class Subject(models.Model):
 
 class Student(models.Model):
     student_id = models.CharField(max_length=20, unique=True, primary_key=True)
-    class_name = models.ForeignKey(UniversityClass, on_delete=models.CASCADE, related_name='students')
+    # Các index (class_name, ...) bên dưới thay cho index mặc định của FK
+    class_name = models.ForeignKey(UniversityClass, on_delete=models.CASCADE, related_name='students', db_index=False)
     student_name = models.CharField(max_length=255)
     student_gmail = models.EmailField()
     passed_credit = models.IntegerField()
@@ -81,9 +89,26 @@ class Student(models.Model):
     is_graduated = models.BooleanField(default=False)
     subjects = models.ManyToManyField(Subject, through='Subject_student', related_name='students')
     rank = models.CharField(max_length=50, blank=True)
+    # Thứ hạng theo score_10 trong lớp, tính lại sau mỗi lần import (xem ranking.py)
+    class_rank = models.PositiveIntegerField(null=True, blank=True)
+    class_dense_rank = models.PositiveIntegerField(null=True, blank=True)
+    class_percentile = models.FloatField(null=True, blank=True)
 
     class Meta:
         db_table = 'student'
+        indexes = [
+            # Danh sách sinh viên của lớp sắp theo điểm
+            models.Index(fields=['class_name', '-score_10', 'student_id'], name='student_class_score10_idx'),
+            models.Index(fields=['class_name', '-score_4', 'student_id'], name='student_class_score4_idx'),
+            # Top-N của lớp theo thứ hạng đã lưu
+            models.Index(fields=['class_name', 'class_rank', 'student_id'], name='student_class_rank_idx'),
+            # Covering index cho thống kê lớp: đọc được toàn bộ từ index
+            models.Index(
+                fields=['class_name'],
+                include=['score_10', 'score_4', 'score_char', 'passed_credit', 'is_graduated'],
+                name='student_class_stats_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student_id} - {self.student_name}"
@@ -108,6 +133,95 @@ class Subject_student(models.Model):
     class Meta:
         db_table = 'subject_student'
         unique_together = ('student', 'subject')
+        indexes = [
+            # Điểm theo môn, sắp theo điểm (unique_together chỉ phủ student trước)
+            models.Index(fields=['subject', '-score_10'], name='subject_student_score_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student} - {self.subject} - {self.score_10}"
+
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Đang chờ'),
+        ('running', 'Đang xử lý'),
+        ('completed', 'Hoàn thành'),
+        ('failed', 'Thất bại')
+    ]
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # import_job_class_hash_idx bên dưới bắt đầu bằng class_name, thay cho index mặc định của FK
+    class_name = models.ForeignKey(UniversityClass, on_delete=models.CASCADE, related_name='import_jobs', db_index=False)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=10)
+    file_hash = models.CharField(max_length=64, blank=True, default='')
+    # File upload nằm trong IMPORT_UPLOAD_DIR (không lưu trong DB) để job vẫn
+    # chạy lại được sau khi worker khởi động lại; xóa khi job xử lý xong
+    file_path = models.CharField(max_length=500, blank=True, default='')
+    status = models.CharField(max_length=20, default='pending', choices=STATUS_CHOICES)
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True, default='')
+    # Version của lớp ngay sau khi import xong; dùng để nhận ra file upload lại không đổi
+    class_version = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'import_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['class_name', 'file_hash'], name='import_job_class_hash_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.class_name_id} - {self.file_name} ({self.status})"
+
+class ClassAggregate(models.Model):
+    """
+    Tổng hợp theo lớp được cập nhật tăng dần khi import hoặc khi lưu/xóa
+    Student, để các view tóm tắt lớp không phải quét lại bảng student.
+    """
+    class_name = models.OneToOneField(UniversityClass, on_delete=models.CASCADE, primary_key=True, related_name='aggregate')
+    student_count = models.IntegerField(default=0)
+    score_10_sum = models.FloatField(default=0)
+    score_10_sumsq = models.FloatField(default=0)
+    score_4_sum = models.FloatField(default=0)
+    score_4_sumsq = models.FloatField(default=0)
+    score_char_counts = models.JSONField(default=dict, blank=True)
+    graduated_count = models.IntegerField(default=0)
+    # Tăng mỗi khi lớp hoặc sinh viên của lớp thay đổi; dùng cho ETag/Last-Modified
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'class_aggregate'
+
+    def __str__(self):
+        return f"{self.class_name_id} - {self.student_count} students"
+
+    def _mean_std(self, total, total_sq):
+        if not self.student_count:
+            return None, None
+        mean = total / self.student_count
+        variance = max(total_sq / self.student_count - mean * mean, 0.0)
+        return round(mean, 4), round(variance ** 0.5, 4)
+
+    def as_summary(self):
+        score_10_mean, score_10_std = self._mean_std(self.score_10_sum, self.score_10_sumsq)
+        score_4_mean, score_4_std = self._mean_std(self.score_4_sum, self.score_4_sumsq)
+        return {
+            'number_of_student': self.student_count,
+            'graduated': self.graduated_count,
+            'score_10_mean': score_10_mean,
+            'score_10_std': score_10_std,
+            'score_4_mean': score_4_mean,
+            'score_4_std': score_4_std,
+            'score_char_distribution': self.score_char_counts,
+        }
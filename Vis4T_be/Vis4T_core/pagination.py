@@ -0,0 +1,26 @@
+from rest_framework.pagination import CursorPagination
+
+
+class StudentCursorPagination(CursorPagination):
+    """
+    Keyset pagination cho danh sách sinh viên: vị trí trang được mã hóa trong
+    cursor nên trang sâu vẫn chỉ tốn O(page_size).
+
+    Chỉ bật khi client gửi `cursor` hoặc `page_size`, để các client cũ vẫn
+    nhận được danh sách đầy đủ như trước.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('student_id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'get_ordering'):
+            return view.get_ordering()
+        return self.ordering
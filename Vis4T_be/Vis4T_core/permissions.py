@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import BasePermission
+
+from .models import Student, UniversityClass
+from .teachers import link_teacher_by_email
+
+OWNERSHIP_CACHE_TIMEOUT = 60
+
+
+def owned_classes(user):
+    """Classes whose teacher is linked to user (one join, no Teacher lookup)"""
+    return UniversityClass.objects.filter(teacher__user=user)
+
+
+def owned_students(user):
+    """Students of the classes owned by user"""
+    return Student.objects.filter(class_name__teacher__user=user)
+
+
+def ownership_cache_key(user_id, key):
+    return f"owns-student:{user_id}:{key}"
+
+
+def request_memo(request):
+    memo = getattr(request, '_ownership_memo', None)
+    if memo is None:
+        memo = {}
+        request._ownership_memo = memo
+    return memo
+
+
+def owned_class_stamp(request, class_name):
+    """
+    (version, updated_at) of the class if request.user owns it, else None.
+
+    The same joined query is the ownership check and the conditional-GET
+    stamp, so a 304 costs one indexed lookup. It is memoized on the request
+    only: a version cached across requests could be stale. Legacy teachers
+    that only match by email are linked on a miss.
+    """
+    memo = request_memo(request)
+    if ('class', class_name) not in memo:
+        queryset = owned_classes(request.user).filter(class_name=class_name) \
+            .values_list('aggregate__version', 'aggregate__updated_at')
+        stamp = queryset.first()
+        # Teacher cũ chưa liên kết với User: liên kết rồi kiểm tra lại một lần
+        if stamp is None and link_teacher_by_email(request.user) is not None:
+            stamp = queryset.first()
+        memo[('class', class_name)] = stamp
+    return memo[('class', class_name)]
+
+
+def user_owns_student(request, student_id):
+    """
+    Does request.user own the student? One joined EXISTS on teacher__user,
+    memoized on the request and cached shortly per user.
+    """
+    memo = request_memo(request)
+    if ('student', student_id) in memo:
+        return memo[('student', student_id)]
+
+    cache_key = ownership_cache_key(request.user.pk, student_id)
+    owns = cache.get(cache_key)
+    if owns is None:
+        queryset = owned_students(request.user).filter(student_id=student_id)
+        owns = queryset.exists()
+        if not owns and link_teacher_by_email(request.user) is not None:
+            owns = queryset.exists()
+        # Sinh viên chuyển lớp hay lớp đổi chủ nhiệm: hết hạn theo TTL ngắn
+        cache.set(cache_key, owns, OWNERSHIP_CACHE_TIMEOUT)
+
+    memo[('student', student_id)] = owns
+    return owns
+
+
+class IsClassOwner(BasePermission):
+    """Chỉ giảng viên chủ nhiệm của lớp <class_name> trong URL mới được truy cập"""
+
+    def has_permission(self, request, view):
+        class_name = view.kwargs.get('class_name')
+        if class_name is None:
+            return True
+        if owned_class_stamp(request, class_name) is None:
+            # Giữ nguyên hành vi cũ: lớp của người khác được xem như không tồn tại
+            raise NotFound("Class not found or you don't have permission to view this class")
+        return True
+
+
+class IsStudentOwner(BasePermission):
+    """Chỉ giảng viên chủ nhiệm lớp của sinh viên <student_id> mới được truy cập"""
+
+    def has_permission(self, request, view):
+        student_id = view.kwargs.get('student_id')
+        if student_id is None:
+            return True
+        if not user_owns_student(request, student_id):
+            # Như IsClassOwner: không phân biệt "không tồn tại" với "của giảng viên khác"
+            raise NotFound("Student not found")
+        return True
@@ -0,0 +1,95 @@
+import numpy as np
+from django.db import connection
+
+from .models import Student, UniversityClass
+
+RANK_FIELDS = ('class_rank', 'class_dense_rank', 'class_percentile')
+
+
+def compute_ranks(scores):
+    """
+    Vectorized ranking of score_10 within a class, highest score first.
+
+    class_rank: standard competition rank (1, 2, 2, 4)
+    class_dense_rank: dense rank (1, 2, 2, 3)
+    class_percentile: % of the class scoring less than or equal (top = 100)
+    Same definitions as RANK(), DENSE_RANK() and CUME_DIST() in SQL. A
+    missing score (None/NaN) ranks below every other score, like NULLS LAST.
+    """
+    scores = np.asarray(scores, dtype=float)
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    descending = np.sort(-scores)
+    rank = np.searchsorted(descending, -scores, side='left') + 1
+    dense_rank = np.searchsorted(np.unique(descending), -scores) + 1
+    # Cùng thứ tự phép tính với CUME_DIST() * 100 để hai cách tính cho cùng giá trị
+    percentile = np.searchsorted(np.sort(scores), scores, side='right') / scores.size * 100
+    return rank, dense_rank, percentile
+
+
+def rank_class(class_name, batch_size=1000):
+    """
+    Recompute the ranks of one class with one read, one NumPy pass and a
+    bulk_update of the rows whose ranks changed. Returns that row count.
+    """
+    rows = list(
+        Student.objects.filter(class_name_id=class_name)
+        .values_list('student_id', 'score_10', *RANK_FIELDS)
+    )
+    if not rows:
+        return 0
+
+    student_ids, scores, *old = zip(*rows)
+    new = compute_ranks(scores)
+    changed = []
+    for i, student_id in enumerate(student_ids):
+        values = (int(new[0][i]), int(new[1][i]), float(new[2][i]))
+        if values != (old[0][i], old[1][i], old[2][i]):
+            changed.append(Student(
+                student_id=student_id,
+                class_rank=values[0], class_dense_rank=values[1], class_percentile=values[2]
+            ))
+    # bulk_update không gửi signal, ClassAggregate không bị ảnh hưởng
+    Student.objects.bulk_update(changed, RANK_FIELDS, batch_size=batch_size)
+    return len(changed)
+
+
+RANK_CLASS_SQL = """
+    UPDATE student AS s
+    SET class_rank = r.class_rank,
+        class_dense_rank = r.class_dense_rank,
+        class_percentile = r.class_percentile
+    FROM (
+        SELECT student_id,
+               RANK() OVER (ORDER BY score_10 DESC NULLS LAST) AS class_rank,
+               DENSE_RANK() OVER (ORDER BY score_10 DESC NULLS LAST) AS class_dense_rank,
+               CUME_DIST() OVER (ORDER BY score_10 NULLS FIRST) * 100 AS class_percentile
+        FROM student
+        WHERE class_name_id = %s
+    ) AS r
+    WHERE s.student_id = r.student_id
+      AND (s.class_rank, s.class_dense_rank, s.class_percentile)
+          IS DISTINCT FROM (r.class_rank, r.class_dense_rank, r.class_percentile)
+"""
+
+
+def rank_class_in_db(class_name):
+    """
+    Same result as rank_class() with one window-function UPDATE; used when
+    a single student is saved or deleted so the class is not loaded into
+    Python. Falls back to rank_class() outside PostgreSQL.
+    """
+    if connection.vendor != 'postgresql':
+        return rank_class(class_name)
+    with connection.cursor() as cursor:
+        cursor.execute(RANK_CLASS_SQL, [class_name])
+        return cursor.rowcount
+
+
+def rank_classes(class_names=None):
+    """Recompute ranks of the given classes (all by default). Returns the class count."""
+    if not class_names:
+        class_names = UniversityClass.objects.values_list('class_name', flat=True)
+    class_names = list(class_names)
+    for class_name in class_names:
+        rank_class(class_name)
+    return len(class_names)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import User, Teacher, UniversityClass, Student
+from .models import User, Teacher, UniversityClass, Student, ImportJob, ClassAggregate
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=6)
@@ -61,11 +61,18 @@ class TeacherSerializer(serializers.ModelSerializer):
 
 class UniversityClassSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    summary = serializers.SerializerMethodField()
     
     class Meta:
         model = UniversityClass
         fields = ['class_name', 'number_of_student', 'class_major', 
-                 'teacher_note', 'total_credit', 'status', 'status_display', 'total_semester']
+                 'teacher_note', 'total_credit', 'status', 'status_display', 'total_semester',
+                 'summary']
+    
+    def get_summary(self, obj):
+        # Đọc từ ClassAggregate (select_related ở view), không quét bảng student
+        aggregate = getattr(obj, 'aggregate', None)
+        return aggregate.as_summary() if aggregate else None
         
 class UniversityClassCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -76,8 +83,117 @@ class UniversityClassCreateSerializer(serializers.ModelSerializer):
 class StudentSerializer(serializers.ModelSerializer):
     class_name_display = serializers.CharField(source='class_name.class_name', read_only=True)
     
+    def __init__(self, *args, **kwargs):
+        # fields=[...] chỉ giữ lại một phần các field (sparse fieldset)
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+    
     class Meta:
         model = Student
         fields = ['student_id', 'class_name', 'class_name_display', 'student_name', 
                  'student_gmail', 'passed_credit', 'score_10', 'score_4', 
-                 'score_char', 'is_graduated']
\ No newline at end of file
+                 'score_char', 'is_graduated', 'rank', 'class_rank',
+                 'class_dense_rank', 'class_percentile']
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    class_name = serializers.CharField(source='class_name_id', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = ['job_id', 'class_name', 'file_name', 'status', 'status_display',
+                 'progress', 'total', 'processed', 'created', 'updated', 'errors',
+                 'message', 'created_at', 'started_at', 'finished_at']
+
+    def get_progress(self, obj):
+        if obj.status == 'completed':
+            return 100
+        if not obj.total:
+            return 0
+        return int(obj.processed * 100 / obj.total)
+
+
+class RowSerializer:
+    """
+    Serializer chỉ đọc cho các endpoint danh sách: nhận dict từ .values() và
+    ánh xạ theo bảng field đã biên dịch sẵn, không qua field machinery của
+    DRF. Kết quả JSON giống serializer ModelSerializer tương ứng.
+
+    spec: (tên field trả về, key trong .values(), hàm chuyển đổi hoặc None).
+    Key None nghĩa là hàm chuyển đổi nhận cả dòng.
+    """
+    spec = ()
+    extra_columns = ()
+
+    def __init__(self, fields=None):
+        self.spec = [item for item in self.spec if not fields or item[0] in fields]
+        columns = {key for _, key, _ in self.spec if key is not None}
+        if any(key is None for _, key, _ in self.spec):
+            columns.update(self.extra_columns)
+        self.columns = sorted(columns)
+
+    def to_representation(self, row):
+        data = {}
+        for name, key, convert in self.spec:
+            if key is None:
+                data[name] = convert(row)
+            else:
+                value = row[key]
+                data[name] = value if convert is None or value is None else convert(value)
+        return data
+
+    def serialize_many(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+class StudentRowSerializer(RowSerializer):
+    spec = (
+        ('student_id', 'student_id', str),
+        ('class_name', 'class_name_id', None),
+        ('class_name_display', 'class_name_id', str),
+        ('student_name', 'student_name', str),
+        ('student_gmail', 'student_gmail', str),
+        ('passed_credit', 'passed_credit', int),
+        ('score_10', 'score_10', float),
+        ('score_4', 'score_4', float),
+        ('score_char', 'score_char', str),
+        ('is_graduated', 'is_graduated', bool),
+        ('rank', 'rank', str),
+        ('class_rank', 'class_rank', int),
+        ('class_dense_rank', 'class_dense_rank', int),
+        ('class_percentile', 'class_percentile', float),
+    )
+
+
+STATUS_LABELS = dict(UniversityClass._meta.get_field('status').choices)
+AGGREGATE_COLUMNS = {
+    f'aggregate__{field}': field
+    for field in ('student_count', 'score_10_sum', 'score_10_sumsq', 'score_4_sum',
+                  'score_4_sumsq', 'score_char_counts', 'graduated_count')
+}
+
+
+def class_summary_from_row(row):
+    if row['aggregate__student_count'] is None:
+        return None
+    return ClassAggregate(**{field: row[key] for key, field in AGGREGATE_COLUMNS.items()}).as_summary()
+
+
+class UniversityClassRowSerializer(RowSerializer):
+    spec = (
+        ('class_name', 'class_name', str),
+        ('number_of_student', 'number_of_student', int),
+        ('class_major', 'class_major', str),
+        ('teacher_note', 'teacher_note', str),
+        ('total_credit', 'total_credit', int),
+        ('status', 'status', None),
+        ('status_display', 'status', lambda value: STATUS_LABELS.get(value, value)),
+        ('total_semester', 'total_semester', int),
+        ('summary', None, class_summary_from_row),
+    )
+    extra_columns = tuple(AGGREGATE_COLUMNS)
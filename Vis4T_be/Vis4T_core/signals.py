@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .aggregates import AGGREGATE_FIELDS, aggregate_row, apply_student_delta, bump_class_version
+from .models import ClassAggregate, ImportJob, Student, Teacher, UniversityClass
+from .ranking import RANK_FIELDS, rank_class_in_db
+from .teachers import forget_teacher
+from .utils import remove_upload
+
+
+@receiver(pre_save, sender=Teacher)
+def forget_previous_teacher_user(sender, instance, **kwargs):
+    if instance.pk:
+        previous_user_id = Teacher.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+        if previous_user_id != instance.user_id:
+            forget_teacher(previous_user_id)
+
+
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+def forget_teacher_on_change(sender, instance, **kwargs):
+    forget_teacher(instance.user_id)
+
+
+@receiver(post_save, sender=UniversityClass)
+def bump_class_on_save(sender, instance, created, **kwargs):
+    if created:
+        ClassAggregate.objects.get_or_create(class_name=instance)
+    else:
+        bump_class_version(instance.class_name)
+
+
+@receiver(post_delete, sender=ImportJob)
+def remove_import_job_upload(sender, instance, **kwargs):
+    # Job bị xóa trước khi chạy (xóa lớp, dọn lịch sử): file upload không còn dùng
+    remove_upload(instance.file_path)
+
+
+@receiver(pre_save, sender=Student)
+def remember_student_aggregate_row(sender, instance, **kwargs):
+    # Giữ giá trị cũ để post_save trừ đi trước khi cộng giá trị mới
+    instance._aggregate_old_row = (
+        Student.objects.filter(pk=instance.pk).values_list(*AGGREGATE_FIELDS).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Student)
+def update_aggregate_on_student_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= set(RANK_FIELDS):
+        return
+    old_row = getattr(instance, '_aggregate_old_row', None)
+    apply_student_delta(
+        added=[aggregate_row(instance)],
+        removed=[old_row] if old_row else []
+    )
+
+    # Sửa từng sinh viên: xếp hạng lại lớp bằng một câu UPDATE window function
+    if old_row is None or old_row[:2] != (instance.class_name_id, instance.score_10):
+        rank_class_in_db(instance.class_name_id)
+        if old_row and old_row[0] != instance.class_name_id:
+            rank_class_in_db(old_row[0])
+
+
+@receiver(post_delete, sender=Student)
+def update_aggregate_on_student_delete(sender, instance, origin=None, **kwargs):
+    # Xóa lớp/giảng viên kéo theo xóa sinh viên: ClassAggregate cũng bị xóa theo
+    if not (isinstance(origin, Student) or getattr(origin, 'model', None) is Student):
+        return
+    apply_student_delta(removed=[aggregate_row(instance)])
+    rank_class_in_db(instance.class_name_id)
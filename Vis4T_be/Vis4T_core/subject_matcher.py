@@ -0,0 +1,111 @@
+import re
+from collections import Counter, defaultdict
+
+from .models import Subject, Subject_class
+from .utils import transliterate_lower
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+# Điểm tối thiểu để chấp nhận một kết quả khớp gần đúng
+MIN_MATCH_SCORE = 0.5
+# Tên này nằm trọn trong tên kia (kiểu khớp một phần của init_db.py cũ)
+CONTAINMENT_SCORE = 0.8
+
+
+def normalize_subject_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation: 'Toán cao cấp 1' -> 'toan cao cap 1'"""
+    return _NON_WORD.sub(' ', transliterate_lower(str(name))).strip()
+
+
+def trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SubjectMatcher:
+    """
+    Map free-text subject names from transcripts to Subject ids.
+
+    Built once per import: exact lookups use normalized, accent-stripped
+    keys; everything else goes through a trigram inverted index and is
+    scored with the Dice coefficient. Ties are broken deterministically:
+    preferred subjects (usually the class curriculum) first, then by
+    subject_id.
+    """
+
+    def __init__(self, subjects):
+        self.exact = defaultdict(list)
+        self.keys = {}
+        self.grams = {}
+        self.index = defaultdict(set)
+        self._cache = {}
+
+        for subject_id, subject_name in sorted(subjects):
+            key = normalize_subject_name(subject_name)
+            if not key:
+                continue
+            self.exact[key].append(subject_id)
+            self.keys[subject_id] = key
+            self.grams[subject_id] = trigrams(key)
+            for gram in self.grams[subject_id]:
+                self.index[gram].add(subject_id)
+
+    @classmethod
+    def from_db(cls):
+        return cls(Subject.objects.values_list('subject_id', 'subject_name'))
+
+    @classmethod
+    def for_class(cls, class_name):
+        """Only the subjects linked to class_name through Subject_class"""
+        return cls(
+            Subject_class.objects.filter(class_name_id=class_name)
+            .values_list('subject_id', 'subject__subject_name')
+        )
+
+    @staticmethod
+    def class_subject_ids(class_names):
+        """{class_name: frozenset(subject_id)} to pass as preferred to match()"""
+        result = defaultdict(set)
+        for class_name, subject_id in Subject_class.objects.filter(
+            class_name_id__in=list(class_names)
+        ).values_list('class_name_id', 'subject_id'):
+            result[class_name].add(subject_id)
+        return {class_name: frozenset(ids) for class_name, ids in result.items()}
+
+    def match(self, name, preferred=frozenset()):
+        """Best subject_id for name, or None below MIN_MATCH_SCORE"""
+        key = normalize_subject_name(name)
+        cache_key = (key, preferred)
+        if cache_key not in self._cache:
+            self._cache[cache_key] = self._match(key, preferred) if key else None
+        return self._cache[cache_key]
+
+    def _match(self, key, preferred):
+        def rank(subject_id, score=1.0):
+            return (-score, subject_id not in preferred, subject_id)
+
+        if key in self.exact:
+            return min(self.exact[key], key=rank)
+
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for subject_id in self.index.get(gram, ()):
+                shared[subject_id] += 1
+
+        best_id, best_rank = None, None
+        for subject_id, count in shared.items():
+            score = 2.0 * count / (len(grams) + len(self.grams[subject_id]))
+            other = self.keys[subject_id]
+            if key in other or other in key:
+                score = max(score, CONTAINMENT_SCORE)
+            if score < MIN_MATCH_SCORE:
+                continue
+            candidate = rank(subject_id, score)
+            if best_rank is None or candidate < best_rank:
+                best_id, best_rank = subject_id, candidate
+        return best_id
+
+    def match_many(self, names, preferred=frozenset()):
+        """{name: subject_id or None} for an iterable of names"""
+        return {name: self.match(name, preferred) for name in set(names)}
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+
+from .models import Teacher
+
+TEACHER_CACHE_TIMEOUT = 300
+TEACHER_MEMO_ATTR = '_teacher_memo'
+
+
+def teacher_cache_key(user_id):
+    return f"teacher-of-user:{user_id}"
+
+
+def link_teacher_by_email(user):
+    """Link the legacy Teacher row that only matches user by email. Returns it, or None."""
+    teacher = Teacher.objects.filter(user__isnull=True, email=user.email).first()
+    if teacher is not None:
+        teacher.user = user
+        teacher.save(update_fields=['user'])
+    return teacher
+
+
+def get_teacher(user, create=False):
+    """
+    Resolve the Teacher of an authenticated user.
+
+    Teacher is linked to User directly. The mapping is cached per user in
+    the shared cache and deleted by the Teacher signals whenever the row
+    changes; within a request it is also memoized on the user object.
+    Legacy rows that only match by email are linked on first use. Raises
+    Teacher.DoesNotExist unless create=True.
+    """
+    teacher = getattr(user, TEACHER_MEMO_ATTR, None)
+    if teacher is not None:
+        return teacher
+    teacher = cache.get(teacher_cache_key(user.pk))
+    if teacher is not None:
+        setattr(user, TEACHER_MEMO_ATTR, teacher)
+        return teacher
+
+    teacher = Teacher.objects.filter(user=user).first() or link_teacher_by_email(user)
+    if teacher is None:
+        if not create:
+            raise Teacher.DoesNotExist
+        # Tạo Teacher record tự động nếu chưa có
+        teacher = Teacher.objects.create(
+            teacher_id=f"T{user.id:06d}",  # T000001 format
+            user=user,
+            email=user.email,
+            password="",  # Not used for auth
+            teacher_fullname=user.full_name or user.username,
+            year_of_birth=1990,  # default value
+            academic_title="Giảng viên",
+            major="Chưa xác định",
+            gender="O",
+            number_of_current_class=0,
+            phone_number=""
+        )
+
+    cache.set(teacher_cache_key(user.pk), teacher, TEACHER_CACHE_TIMEOUT)
+    setattr(user, TEACHER_MEMO_ATTR, teacher)
+    return teacher
+
+
+def forget_teacher(user_id):
+    if user_id is not None:
+        cache.delete(teacher_cache_key(user_id))
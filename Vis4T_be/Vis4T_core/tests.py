@@ -1,3 +1,1034 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import jwt
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook, load_workbook
+from rest_framework.test import APIClient
+
+from . import batch, exports, jobs, metabase, signals, utils
+from .management.commands import bench_excel_ingest, seed_db
+from .aggregates import rebuild_class_aggregates
+from .analytics import (
+    STATS_FIELDS, at_risk_cache_key, build_class_at_risk, compute_at_risk, load_at_risk_counts
+)
+from .models import ClassAggregate, ImportJob, Student, Subject, Subject_class, Subject_student, Teacher, UniversityClass, User
+from .ranking import RANK_FIELDS, compute_ranks, rank_class, rank_class_in_db
+from .renderers import FastJSONRenderer
+from .serializers import StudentSerializer
+from .teachers import get_teacher, teacher_cache_key
+from .utils import DataProcessor, bulk_upsert_students
+
+
+def create_teacher(username):
+    user = User.objects.create_user(username=username, email=f"{username}@iuh.edu.vn", password='x')
+    teacher = Teacher.objects.create(
+        teacher_id=f"T-{username}", user=user, email=user.email, password='',
+        teacher_fullname=username, year_of_birth=1990, academic_title='',
+        major='', gender='O', phone_number=''
+    )
+    return user, teacher
+
+
+def create_class(teacher, class_name, students=3):
+    university_class = UniversityClass.objects.create(
+        class_name=class_name, teacher=teacher, class_major='CNTT',
+        total_credit=156, total_semester=9
+    )
+    for i in range(students):
+        score_10 = 5 + (i % 5)
+        Student.objects.create(
+            student_id=f"{class_name}-{i:04d}", class_name=university_class,
+            student_name=f"Sinh Viên {i}", student_gmail=f"sv{i}@iuh.edu.vn",
+            passed_credit=10 * (i % 10), score_10=score_10, score_4=score_10 * 0.4,
+            score_char='B', rank='Khá'
+        )
+    return university_class
+
+
+def build_roster(rows):
+    """DataFrame in the shape of get_all_student_detail() from (student_id, name, score_10) rows"""
+    return pd.DataFrame([
+        {
+            'student_id': student_id, 'passed_credit': 30, 'score_10': score_10,
+            'score_4': round(score_10 * 0.4, 2), 'score_char': 'B', 'rank': 'Khá',
+            'student_name': name, 'student_gmail': f"{student_id.lower()}@iuh.edu.vn",
+        }
+        for student_id, name, score_10 in rows
+    ])
+
+
+def export_rows(students, subjects=('Môn 1',), group_row=True):
+    """
+    Rows of a roster in the layout of the school export (see
+    bench_excel_ingest.export_layout) from (student_id, name, passed_credit,
+    score_10) tuples; every subject score is 7.5
+    """
+    body = [
+        [i + 1, student_id, 'Nguyễn Văn', name, *[7.5] * len(subjects),
+         passed_credit, score_10, round(score_10 * 0.4, 2), 'B', 'Khá', 80, 'Tốt']
+        for i, (student_id, name, passed_credit, score_10) in enumerate(students)
+    ]
+    return bench_excel_ingest.export_layout(body, subjects, group_row)
+
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+def export_xlsx(rows, sheet_name='Sheet1'):
+    workbook = Workbook()
+    workbook.active.title = sheet_name
+    for row in rows:
+        workbook.active.append(row)
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+@skipUnless(connection.vendor == 'postgresql', "EXPLAIN plans are checked on PostgreSQL only")
+class QueryPlanTests(TestCase):
+    """
+    The hot query of each endpoint must be served by the index added for it.
+    The fixture tables are tiny, so sequential scans are disabled to see
+    which index the planner would pick on real data.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.teacher = create_teacher('plans')
+        cls.university_class = create_class(cls.teacher, 'DHKTPM17A', students=20)
+        subject = Subject.objects.create(subject_id='MH001', subject_name='Toán', credit=3)
+        Subject_student.objects.create(
+            student=Student.objects.filter(class_name=cls.university_class).first(),
+            subject=subject, score_10=8
+        )
+
+    def hot_queries(self):
+        """name -> (queryset, index names any of which the plan may use)"""
+        class_name = self.university_class.class_name
+        return {
+            # Index tự sinh của Django: chỉ biết trước tiền tố tên
+            'teacher by user': (Teacher.objects.filter(user_id=self.user.pk), ('teacher_user_id',)),
+            'teacher by email': (Teacher.objects.filter(email=self.teacher.email), ('teacher_email',)),
+            'class list': (UniversityClass.objects.filter(teacher=self.teacher), ('class_teacher_name_idx',)),
+            'class detail': (
+                UniversityClass.objects.filter(teacher=self.teacher, class_name=class_name),
+                ('class_teacher_name_idx', 'university_class_pkey'),
+            ),
+            'class students': (
+                Student.objects.filter(class_name_id=class_name).order_by('-score_10', 'student_id'),
+                ('student_class_score10_idx',),
+            ),
+            'class students by score_4': (
+                Student.objects.filter(class_name_id=class_name).order_by('-score_4', 'student_id'),
+                ('student_class_score4_idx',),
+            ),
+            'class top-N by rank': (
+                Student.objects.filter(class_name_id=class_name).order_by('class_rank', 'student_id')[:10],
+                ('student_class_rank_idx',),
+            ),
+            'class stats': (
+                Student.objects.filter(class_name_id=class_name).values_list(*STATS_FIELDS),
+                ('student_class_stats_idx',),
+            ),
+            'subject scores': (
+                Subject_student.objects.filter(subject_id='MH001').order_by('-score_10'),
+                ('subject_student_score_idx',),
+            ),
+            'unchanged upload lookup': (
+                ImportJob.objects.filter(class_name_id=class_name, file_hash='0' * 64, status='completed'),
+                ('import_job_class_hash_idx',),
+            ),
+        }
+
+    def test_hot_queries_use_their_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        for name, (queryset, indexes) in self.hot_queries().items():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertNotIn('Seq Scan', plan)
+                self.assertTrue(
+                    any(f" on {index}" in plan or f" using {index}" in plan for index in indexes),
+                    f"{name} does not use {' or '.join(indexes)}:\n{plan}"
+                )
+
+
+class ListQueryCountTests(TestCase):
+    """
+    The list endpoints read their rows with .values() and a row serializer:
+    the number of queries must not grow with the number of rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.small_user, small_teacher = create_teacher('small')
+        cls.large_user, large_teacher = create_teacher('large')
+        create_class(small_teacher, 'SMALL', students=2)
+        create_class(large_teacher, 'LARGE', students=40)
+        for i in range(5):
+            create_class(large_teacher, f"LARGE-{i}", students=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, user, url):
+        client = APIClient()
+        # User mới mỗi request: teacher được memo trên chính object user
+        client.force_authenticate(User.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, len(queries)
+
+    def test_class_students_query_count_is_constant(self):
+        _, expected = self.get(self.small_user, '/api/classes/SMALL/students/')
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.large_user.pk))
+        with self.assertNumQueries(expected):
+            response = client.get('/api/classes/LARGE/students/')
+        self.assertEqual(len(response.json()), 40)
+
+    def test_class_list_query_count_is_constant(self):
+        _, expected = self.get(self.small_user, '/api/classes/')
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.large_user.pk))
+        with self.assertNumQueries(expected):
+            response = client.get('/api/classes/')
+        self.assertEqual(len(response.json()), 6)
+
+    def test_class_students_json_matches_model_serializer(self):
+        response, _ = self.get(self.large_user, '/api/classes/LARGE/students/?ordering=student_id')
+        students = Student.objects.filter(class_name_id='LARGE').order_by('student_id')
+        expected = FastJSONRenderer().render(StudentSerializer(students, many=True).data)
+        self.assertEqual(response.content, expected)
+
+
+class TeacherCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_teacher_is_cached_and_forgotten_on_change(self):
+        user, teacher = create_teacher('cached')
+        get_teacher(User.objects.get(pk=user.pk))
+
+        # Request sau: object user mới, không còn memo, teacher lấy từ cache
+        with self.assertNumQueries(0):
+            self.assertEqual(get_teacher(User(pk=user.pk)).pk, teacher.pk)
+
+        teacher.teacher_fullname = 'Renamed'
+        teacher.save()
+        self.assertIsNone(cache.get(teacher_cache_key(user.pk)))
+        self.assertEqual(get_teacher(User.objects.get(pk=user.pk)).teacher_fullname, 'Renamed')
+
+    def test_legacy_teacher_is_linked_by_email(self):
+        user = User.objects.create_user(username='legacy', email='legacy@iuh.edu.vn', password='x')
+        teacher = Teacher.objects.create(
+            teacher_id='T-legacy', email=user.email, password='', teacher_fullname='Legacy',
+            year_of_birth=1990, academic_title='', major='', gender='O', phone_number=''
+        )
+        self.assertEqual(get_teacher(user).pk, teacher.pk)
+        teacher.refresh_from_db()
+        self.assertEqual(teacher.user_id, user.pk)
+
+
+@override_settings(METABASE_URL='http://metabase.test', METABASE_SECRET_KEY='test-secret-with-at-least-32-bytes')
+class OwnershipTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, teacher = create_teacher('owner')
+        cls.other_user, other_teacher = create_teacher('other')
+        create_class(teacher, 'OWNED', students=2)
+        create_class(other_teacher, 'FOREIGN', students=2)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+    def test_student_dashboard_checks_ownership_in_one_query(self):
+        # EXISTS có join + đọc sinh viên, không tra Teacher riêng
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/students/OWNED-0000/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+        # Lần sau quyền lấy từ cache
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        with self.assertNumQueries(1):
+            self.client.get('/api/students/OWNED-0000/dashboard/')
+
+    def test_foreign_and_missing_ids_are_not_found(self):
+        for url in (
+            '/api/students/FOREIGN-0000/dashboard/',
+            '/api/students/MISSING/dashboard/',
+            '/api/classes/FOREIGN/students/',
+            '/api/classes/MISSING/students/',
+        ):
+            with self.subTest(url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_class_reassignment_forgets_cached_ownership(self):
+        self.assertEqual(self.client.get('/api/classes/FOREIGN/students/').status_code, 404)
+        university_class = UniversityClass.objects.get(pk='FOREIGN')
+        university_class.teacher = Teacher.objects.get(user=self.user)
+        university_class.save()
+        self.assertEqual(self.client.get('/api/classes/FOREIGN/students/').status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, teacher = create_teacher('etag')
+        cls.university_class = create_class(teacher, 'ETAG', students=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, **headers):
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.user.pk))
+        return client.get(url, headers=headers)
+
+    def test_matching_etag_returns_304_after_one_query(self):
+        url = '/api/classes/ETAG/students/'
+        etag = self.get(url)['ETag']
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.user.pk))
+        # Quyền sở hữu và version của lớp trong cùng một truy vấn
+        with self.assertNumQueries(1):
+            response = client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.get('/api/classes/')
+        self.assertEqual(self.get('/api/classes/', **{'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_etag_changes_after_student_write(self):
+        url = '/api/classes/ETAG/students/'
+        etag = self.get(url)['ETag']
+        list_etag = self.get('/api/classes/')['ETag']
+
+        student = Student.objects.get(pk='ETAG-0000')
+        student.score_10 = 9.5
+        student.save()
+
+        response = self.get(url, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotEqual(self.get('/api/classes/')['ETag'], list_etag)
+
+    def test_etag_changes_after_upload(self):
+        url = '/api/classes/ETAG/students/'
+        etag = self.get(url)['ETag']
+
+        bulk_upsert_students(self.university_class, build_roster([
+            ('ETAG-0000', 'Sinh Viên 0', 8.0),
+            ('ETAG-0100', 'Sinh Viên Mới', 7.0),
+        ]))
+
+        response = self.get(url, **{'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 4)
+
+
+@override_settings(METABASE_URL='http://metabase.test', METABASE_SECRET_KEY='test-secret')
+class DashboardEmbedUrlTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_token_is_a_valid_metabase_embed_token(self):
+        before = int(time.time())
+        url = metabase.get_dashboard_embed_url('2', {'class_name': 'DHKTPM17A'})
+
+        prefix = 'http://metabase.test/embed/dashboard/'
+        self.assertTrue(url.startswith(prefix), url)
+        token, fragment = url[len(prefix):].split('#')
+        self.assertEqual(fragment, 'bordered=true&titled=true')
+
+        payload = jwt.decode(token, 'test-secret', algorithms=['HS256'])
+        self.assertEqual(payload['resource'], {'dashboard': 2})
+        self.assertEqual(payload['params'], {'class_name': 'DHKTPM17A'})
+        self.assertGreaterEqual(payload['exp'], before + metabase.EMBED_TOKEN_TTL)
+        self.assertLessEqual(payload['exp'], int(time.time()) + metabase.EMBED_TOKEN_TTL)
+
+    def test_url_is_reused_within_ttl(self):
+        with mock.patch.object(metabase, 'sign_embed_token', wraps=metabase.sign_embed_token) as sign:
+            first = metabase.get_dashboard_embed_url('2', {'class_name': 'DHKTPM17A'})
+            second = metabase.get_dashboard_embed_url('2', {'class_name': 'DHKTPM17A'})
+            other = metabase.get_dashboard_embed_url('2', {'class_name': 'DHKTPM17B'})
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(sign.call_count, 2)
+
+
+class ImportJobRecoveryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _, teacher = create_teacher('recovery')
+        cls.university_class = create_class(teacher, 'RECOVERY', students=0)
+
+    def setUp(self):
+        cache.clear()
+        executor = mock.Mock()
+        patcher = mock.patch.multiple(jobs, _executor=executor, _last_recovery=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.executor = executor
+
+    def create_job(self, **fields):
+        return ImportJob.objects.create(
+            class_name=self.university_class, file_name='roster.csv',
+            file_type='csv', **fields
+        )
+
+    def submitted(self):
+        return [call.args[1] for call in self.executor.submit.call_args_list]
+
+    @override_settings(IMPORT_JOB_STALE_SECONDS=60, IMPORT_JOB_RECOVERY_SECONDS=60)
+    def test_stale_running_job_is_requeued_once_per_interval(self):
+        stale = self.create_job(status='running')
+        live = self.create_job(status='running')
+        ImportJob.objects.filter(pk=stale.pk).update(
+            updated_at=stale.updated_at - timedelta(minutes=5)
+        )
+
+        jobs.recover_jobs()
+        self.assertEqual(self.submitted(), [stale.job_id])
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(stale.status, 'pending')
+        self.assertEqual(live.status, 'running')
+
+        # Lần hỏi tiến độ tiếp theo trong cùng khoảng không quét lại
+        with self.assertNumQueries(0):
+            jobs.recover_jobs()
+        self.assertEqual(len(self.submitted()), 1)
+
+    def test_batch_skips_jobs_claimed_while_parsing(self):
+        taken = self.create_job()
+        mine = self.create_job()
+
+        def parse(files, workers):
+            # Một worker khác nhận job trong lúc batch này đang parse
+            jobs.claim_job(taken.job_id)
+            return [(pd.DataFrame(), None)] * len(files)
+
+        with mock.patch.object(jobs, 'parse_rosters', side_effect=parse), \
+                mock.patch.object(jobs, 'complete_job') as complete, \
+                mock.patch.object(jobs, 'close_old_connections'), \
+                mock.patch.object(jobs, 'connection'):
+            jobs.run_import_batch([taken.job_id, mine.job_id])
+
+        self.assertEqual([call.args[0].job_id for call in complete.call_args_list], [mine.job_id])
+
+    @override_settings(IMPORT_JOB_STALE_SECONDS=60)
+    def test_progress_heartbeat_keeps_a_long_import_running(self):
+        job = self.create_job(status='running', total=1000)
+        ImportJob.objects.filter(pk=job.pk).update(
+            updated_at=job.updated_at - timedelta(minutes=5)
+        )
+        jobs.report_progress(job.job_id, 500)
+
+        jobs.recover_jobs()
+        self.assertEqual(self.submitted(), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(jobs.job_progress(job), 500)
+
+
+class BulkUpsertTransactionTests(TestCase):
+
+    def test_failure_after_some_batches_rolls_back_the_whole_roster(self):
+        _, teacher = create_teacher('rollback')
+        university_class = create_class(teacher, 'ROLLBACK', students=2)
+        before = ClassAggregate.objects.values().get(class_name_id='ROLLBACK')
+        roster = build_roster([
+            ('ROLLBACK-0000', 'Đổi Tên', 9.0),
+            ('ROLLBACK-0100', 'Sinh Viên Mới', 7.0),
+            ('ROLLBACK-0101', 'Sinh Viên Mới', 6.0),
+        ])
+
+        progress = mock.Mock()
+        with mock.patch.object(utils, 'rank_class', side_effect=RuntimeError('rank failed')):
+            with self.assertRaises(RuntimeError):
+                bulk_upsert_students(university_class, roster, batch_size=1, progress=progress)
+
+        self.assertEqual(progress.call_count, 3)
+        self.assertEqual(Student.objects.filter(class_name=university_class).count(), 2)
+        self.assertEqual(Student.objects.get(pk='ROLLBACK-0000').student_name, 'Sinh Viên 0')
+        self.assertEqual(ClassAggregate.objects.values().get(class_name_id='ROLLBACK'), before)
+
+
+class AtRiskCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _, teacher = create_teacher('atrisk')
+        first, second = Subject.objects.bulk_create([
+            Subject(subject_id='AR-1', subject_name='Môn 1', credit=3),
+            Subject(subject_id='AR-2', subject_name='Môn 2', credit=4),
+        ])
+        for class_name, semesters in (('AR-A', (1, 2)), ('AR-B', (2, 1)), ('AR-C', None)):
+            university_class = create_class(teacher, class_name)
+            if semesters is None:
+                continue
+            # Cùng môn nhưng học kỳ khác nhau theo từng lớp
+            for subject, semester_id in zip((first, second), semesters):
+                Subject_class.objects.create(class_name=university_class, subject=subject, semester_id=semester_id)
+            Subject_student.objects.bulk_create([
+                Subject_student(student_id=f"{class_name}-0000", subject=first, score_10=9.0),
+                Subject_student(student_id=f"{class_name}-0000", subject=second, score_10=5.0),
+                Subject_student(student_id=f"{class_name}-0001", subject=first, score_10=2.0),
+                Subject_student(student_id=f"{class_name}-0001", subject=second, score_10=3.0),
+            ])
+        cls.versions = [('AR-A', 1), ('AR-B', 1), ('AR-C', 1)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_uncached_classes_are_computed_together_and_cached_per_class(self):
+        with self.assertNumQueries(3):
+            counts = load_at_risk_counts(self.versions)
+
+        expected = {name: build_class_at_risk(name) for name, _ in self.versions}
+        self.assertEqual(counts, {name: data['at_risk_count'] for name, data in expected.items()})
+        for name, version in self.versions:
+            self.assertEqual(cache.get(at_risk_cache_key(name, version)), expected[name])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(load_at_risk_counts(self.versions), counts)
+
+    def test_semester_of_a_score_comes_from_the_students_class(self):
+        load_at_risk_counts(self.versions)
+        flags = {
+            name: {row['student_id']: row['flags'] for row in cache.get(at_risk_cache_key(name, 1))['students']}
+            for name in ('AR-A', 'AR-B')
+        }
+        # 9 -> 5 ở lớp A là giảm, còn ở lớp B thứ tự học kỳ ngược lại
+        self.assertIn('declining', flags['AR-A']['AR-A-0000'])
+        self.assertNotIn('declining', flags['AR-B'].get('AR-B-0000', []))
+        self.assertIn('failed_credits', flags['AR-A']['AR-A-0001'])
+        self.assertIn('failed_credits', flags['AR-B']['AR-B-0001'])
+
+
+class BulkUpsertStudentsTests(TestCase):
+
+    def test_mixed_roster_counts_and_re_ranks_the_class_students_left(self):
+        _, teacher = create_teacher('mixed')
+        university_class = create_class(teacher, 'MIXED', students=2)
+        create_class(teacher, 'LEFT', students=3)
+        roster = build_roster([
+            ('MIXED-0000', 'Đổi Tên', 9.0),        # cập nhật
+            ('MIXED-0100', 'Sinh Viên Mới', 7.0),  # thêm mới
+            ('LEFT-0002', 'Chuyển Lớp', 8.0),      # chuyển từ lớp LEFT sang
+            ('MIXED-0101', 'Tên', 6.0),
+            ('MIXED-0102', 'Tên', 6.0),
+        ])
+        roster.loc[3, 'student_name'] = float('nan')
+        roster.loc[4, 'score_char'] = 'ABCD'
+
+        created, updated, errors = bulk_upsert_students(university_class, roster, batch_size=2)
+
+        self.assertEqual((created, updated), (1, 2))
+        self.assertEqual(len(errors), 2)
+        self.assertIn('MIXED-0101', errors[0])
+        self.assertIn('student_name', errors[0])
+        self.assertIn('MIXED-0102', errors[1])
+        self.assertIn('score_char', errors[1])
+        self.assertFalse(Student.objects.filter(pk__in=['MIXED-0101', 'MIXED-0102']).exists())
+
+        self.assertEqual(
+            list(Student.objects.filter(class_name_id='MIXED').order_by('class_rank')
+                 .values_list('student_id', 'class_rank')),
+            [('MIXED-0000', 1), ('LEFT-0002', 2), ('MIXED-0100', 3), ('MIXED-0001', 4)]
+        )
+        # Lớp cũ được xếp hạng lại và cập nhật sĩ số
+        self.assertEqual(
+            list(Student.objects.filter(class_name_id='LEFT').order_by('class_rank')
+                 .values_list('student_id', 'class_rank')),
+            [('LEFT-0001', 1), ('LEFT-0000', 2)]
+        )
+        self.assertEqual(ClassAggregate.objects.get(class_name_id='LEFT').student_count, 2)
+        self.assertEqual(ClassAggregate.objects.get(class_name_id='MIXED').student_count, 4)
+
+
+class UploadStudentsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, teacher = create_teacher('uploader')
+        create_class(teacher, 'UPLOAD', students=0)
+
+    def setUp(self):
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        overrides = override_settings(IMPORT_UPLOAD_DIR=upload_dir.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.upload_dir = upload_dir.name
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.content = export_csv(export_rows([(20000001, 'An', 30, 7.25), (20000002, 'Bình', 45, 8.5)]))
+
+    def test_upload_is_stored_on_disk_and_removed_after_import(self):
+        response = self.client.post(
+            '/api/classes/UPLOAD/upload-students/',
+            {'file': SimpleUploadedFile('roster.csv', self.content)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 202)
+        job = ImportJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual(os.path.dirname(job.file_path), self.upload_dir)
+        with open(job.file_path, 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+        with mock.patch.object(jobs, 'close_old_connections'), mock.patch.object(jobs, 'connection'):
+            jobs.run_import_job(job.job_id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.created, job.file_path), ('completed', 2, ''))
+        self.assertEqual(os.listdir(self.upload_dir), [])
+        self.assertEqual(
+            list(Student.objects.filter(class_name_id='UPLOAD').order_by('pk').values_list('pk', 'passed_credit')),
+            [('20000001', 30), ('20000002', 45)]
+        )
+
+    def test_csv_columns_have_the_xlsx_dtypes(self):
+        rows = export_rows([(20000001, 'An', 30, 7.25), (20000002, 'Bình', 45, 8.5)])
+        from_csv = DataProcessor(io.BytesIO(export_csv(rows)), file_type='csv').get_all_student_detail()
+        from_xlsx = DataProcessor(io.BytesIO(export_xlsx(rows)), file_type='xlsx').get_all_student_detail()
+        self.assertEqual(from_csv['passed_credit'].dtype, 'int64')
+        self.assertEqual(from_csv.dtypes.to_dict(), from_xlsx.dtypes.to_dict())
+
+
+class UploadScoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, teacher = create_teacher('scores')
+        university_class = create_class(teacher, 'SCORES', students=0)
+        bulk_upsert_students(university_class, build_roster([
+            ('20000001', 'An', 7.0), ('20000002', 'Bình', 8.0),
+        ]))
+        for subject_id, name, semester_id in (('TCC', 'Toán cao cấp', 1), ('LTJ', 'Lập trình Java', 2)):
+            subject = Subject.objects.create(subject_id=subject_id, subject_name=name, credit=3)
+            Subject_class.objects.create(class_name=university_class, subject=subject, semester_id=semester_id)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+    def upload(self, name, content):
+        return self.client.post(
+            '/api/classes/SCORES/upload-scores/',
+            {'file': SimpleUploadedFile(name, content)}, format='multipart'
+        )
+
+    def test_transcript_scores_are_imported(self):
+        rows = export_rows(
+            [(20000001, 'An', 30, 7.0), (20000002, 'Bình', 45, 8.0)],
+            subjects=('Toán cao cấp', 'Lập trình Java')
+        )
+        response = self.upload('transcript.xlsx', export_xlsx(rows))
+
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['matched_subjects'], {'Toán cao cấp': 'TCC', 'Lập trình Java': 'LTJ'})
+        self.assertEqual(data['created'], 4)
+        self.assertEqual(
+            Subject_student.objects.filter(student__class_name_id='SCORES').count(), 4
+        )
+
+    def test_score_upload_refreshes_the_cached_at_risk_list(self):
+        before = self.client.get('/api/classes/SCORES/at-risk/').json()
+        self.assertEqual(before['at_risk_count'], 0)
+
+        # Trượt cả hai môn (6 tín chỉ): bị cảnh báo ngay sau khi upload
+        rows = export_rows([(20000001, 'An', 30, 3.0)], subjects=('Toán cao cấp', 'Lập trình Java'))
+        rows[10][4:6] = [3.0, 2.0]
+        self.assertEqual(self.upload('transcript.xlsx', export_xlsx(rows)).status_code, 200)
+
+        after = self.client.get('/api/classes/SCORES/at-risk/').json()
+        self.assertEqual(after['at_risk_count'], 1)
+        self.assertEqual(after['students'][0]['student_id'], '20000001')
+        self.assertIn('failed_credits', after['students'][0]['flags'])
+
+    def test_unreadable_files_are_bad_requests(self):
+        for name, content in (
+            ('transcript.xlsx', b'not a spreadsheet'),
+            ('transcript.xlsx', b'PK\x03\x04 truncated zip'),
+            ('transcript.csv', b'\xff\xfe\x00 not utf-8'),
+            ('transcript.csv', b''),
+            ('transcript.pdf', b'%PDF-1.4'),
+        ):
+            with self.subTest(name=name, content=content):
+                response = self.upload(name, content)
+                self.assertEqual(response.status_code, 400, response.content)
+                self.assertIn('detail', response.json())
+        self.assertFalse(Subject_student.objects.exists())
+
+
+class SeedReadJsonTests(SimpleTestCase):
+
+    def setUp(self):
+        data_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(data_dir.cleanup)
+        with open(os.path.join(data_dir.name, 'broken.json'), 'w', encoding='utf-8') as f:
+            f.write('{"class_name": ')
+        self.command = seed_db.Command(stdout=io.StringIO())
+        self.command.data_dir = Path(data_dir.name)
+
+    def test_invalid_required_file_stops_the_seed(self):
+        with self.assertRaisesMessage(CommandError, 'broken.json: '):
+            self.command.read_json('broken.json')
+
+    def test_invalid_optional_file_is_skipped(self):
+        self.assertIsNone(self.command.read_json('broken.json', required=False))
+        self.assertIn('Invalid JSON in broken.json', self.command.stdout.getvalue())
+
+
+class ComputeRanksTests(SimpleTestCase):
+
+    def test_ties_and_missing_scores(self):
+        rank, dense_rank, percentile = compute_ranks([9.0, 8.0, 8.0, None, 7.0])
+        # RANK() để lại khoảng trống sau nhóm bằng điểm, DENSE_RANK() thì không
+        self.assertEqual(rank.tolist(), [1, 2, 2, 5, 4])
+        self.assertEqual(dense_rank.tolist(), [1, 2, 2, 4, 3])
+        # CUME_DIST(): tỉ lệ sinh viên có điểm <= điểm của mình; thiếu điểm xếp cuối
+        self.assertEqual(percentile.tolist(), [100.0, 80.0, 80.0, 20.0, 40.0])
+
+    def test_all_tied(self):
+        rank, dense_rank, percentile = compute_ranks([6.0, 6.0, 6.0])
+        self.assertEqual(rank.tolist(), [1, 1, 1])
+        self.assertEqual(dense_rank.tolist(), [1, 1, 1])
+        self.assertEqual(percentile.tolist(), [100.0, 100.0, 100.0])
+
+    def test_single_student(self):
+        self.assertEqual([values.tolist() for values in compute_ranks([6.5])], [[1], [1], [100.0]])
+
+
+@skipUnless(connection.vendor == 'postgresql', "The window-function UPDATE runs on PostgreSQL only")
+class RankClassInDbTests(TestCase):
+
+    def test_sql_ranks_match_numpy_ranks(self):
+        _, teacher = create_teacher('ranking')
+        # create_class cho điểm 5..9 lặp lại: nhiều nhóm bằng điểm
+        create_class(teacher, 'RANKING', students=23)
+        students = Student.objects.filter(class_name_id='RANKING').order_by('student_id')
+
+        students.update(class_rank=None, class_dense_rank=None, class_percentile=None)
+        rank_class_in_db('RANKING')
+        in_db = list(students.values_list('student_id', *RANK_FIELDS))
+
+        students.update(class_rank=None, class_dense_rank=None, class_percentile=None)
+        rank_class('RANKING')
+        self.assertEqual(list(students.values_list('student_id', *RANK_FIELDS)), in_db)
+
+
+class ClassAggregateSignalTests(TestCase):
+
+    FIELDS = ('student_count', 'score_10_sum', 'score_10_sumsq', 'score_4_sum',
+              'score_4_sumsq', 'graduated_count', 'score_char_counts')
+
+    def snapshot(self):
+        return {
+            aggregate.class_name_id: aggregate
+            for aggregate in ClassAggregate.objects.filter(class_name_id__in=['AGG-A', 'AGG-B'])
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_class_aggregates(['AGG-A', 'AGG-B'])
+        rebuilt = self.snapshot()
+        for class_name, aggregate in rebuilt.items():
+            for field in self.FIELDS:
+                with self.subTest(class_name=class_name, field=field):
+                    expected, actual = getattr(aggregate, field), getattr(incremental[class_name], field)
+                    if isinstance(expected, float):
+                        self.assertAlmostEqual(actual, expected)
+                    else:
+                        self.assertEqual(actual, expected)
+            self.assertEqual(
+                UniversityClass.objects.get(pk=class_name).number_of_student,
+                Student.objects.filter(class_name_id=class_name).count()
+            )
+        return incremental
+
+    def test_student_writes_keep_aggregates_equal_to_a_rebuild(self):
+        _, teacher = create_teacher('aggregates')
+        class_a = create_class(teacher, 'AGG-A', students=3)
+        create_class(teacher, 'AGG-B', students=2)
+        versions = {name: aggregate.version for name, aggregate in self.snapshot().items()}
+
+        Student.objects.create(
+            student_id='AGG-A-0100', class_name=class_a, student_name='Mới', student_gmail='moi@iuh.edu.vn',
+            passed_credit=12, score_10=3.5, score_4=1.4, score_char='F', rank='Kém'
+        )
+        student = Student.objects.get(pk='AGG-A-0000')
+        student.score_10, student.score_4, student.score_char, student.is_graduated = 9.5, 3.8, 'A', True
+        student.save()
+        moved = Student.objects.get(pk='AGG-B-0000')
+        moved.class_name = class_a
+        moved.save()
+        Student.objects.get(pk='AGG-A-0001').delete()
+
+        incremental = self.assertMatchesRebuild()
+        self.assertEqual(incremental['AGG-A'].student_count, 4)
+        self.assertEqual(incremental['AGG-B'].student_count, 1)
+        for name, version in versions.items():
+            self.assertGreater(incremental[name].version, version)
+
+    def test_cascade_delete_skips_the_per_student_delta(self):
+        _, teacher = create_teacher('cascade')
+        create_class(teacher, 'AGG-A', students=2)
+        class_b = create_class(teacher, 'AGG-B', students=3)
+
+        with mock.patch.object(signals, 'apply_student_delta') as apply_delta:
+            class_b.delete()
+
+        apply_delta.assert_not_called()
+        self.assertFalse(ClassAggregate.objects.filter(class_name_id='AGG-B').exists())
+        self.assertMatchesRebuild()
+
+
+class ComputeAtRiskTests(SimpleTestCase):
+    # 120 tín chỉ trong 8 học kỳ: 15 tín chỉ mỗi học kỳ
+    TOTAL_CREDIT, TOTAL_SEMESTER = 120, 8
+
+    STUDENTS = [
+        ('DECLINE', 'Giảm điểm', 40),
+        ('FAIL', 'Rớt môn', 40),
+        ('LOWGPA', 'Điểm thấp', 40),
+        ('NOSCORE', 'Chưa có điểm', 10),
+        ('OUTSIDE', 'Môn ngoài chương trình', 40),
+        ('SLOW', 'Chậm tiến độ', 10),
+    ]
+    # (student_id, score_10, credit, semester_id); -1 là môn không thuộc chương trình của lớp
+    SCORES = [
+        ('FAIL', 3.0, 3, 1), ('FAIL', 3.0, 3, 2), ('FAIL', 9.0, 4, 1), ('FAIL', 9.0, 4, 2),
+        ('LOWGPA', 4.5, 3, 1), ('LOWGPA', 4.5, 3, 2),
+        ('DECLINE', 9.0, 3, 1), ('DECLINE', 7.5, 3, 2),
+        ('SLOW', 8.0, 3, 1), ('SLOW', 8.0, 3, 2),
+        # Điểm 0 ngoài chương trình: tính vào GPA nhưng không phải học kỳ mới nhất
+        ('OUTSIDE', 9.0, 3, 1), ('OUTSIDE', 9.0, 3, 2), ('OUTSIDE', 3.0, 3, -1),
+        # Sinh viên không thuộc lớp: bỏ qua
+        ('GHOST', 0.0, 10, 1),
+    ]
+
+    def scores(self):
+        student_id, score_10, credit, semester_id = zip(*self.SCORES)
+        return {
+            'student_id': np.asarray(student_id, dtype=object),
+            'score_10': np.asarray(score_10, dtype=float),
+            'credit': np.asarray(credit, dtype=float),
+            'semester_id': np.asarray(semester_id, dtype=int),
+        }
+
+    def test_each_rule_flags_its_student(self):
+        result = {
+            row['student_id']: row
+            for row in compute_at_risk(self.STUDENTS, self.scores(), self.TOTAL_CREDIT, self.TOTAL_SEMESTER)
+        }
+        self.assertEqual({student_id: row['flags'] for student_id, row in result.items()}, {
+            'DECLINE': ['declining'],
+            'FAIL': ['failed_credits'],
+            'LOWGPA': ['low_gpa'],
+            'NOSCORE': ['behind_pace'],
+            'SLOW': ['behind_pace'],
+        })
+        self.assertEqual(result['FAIL']['failed_credits'], 6)
+        self.assertEqual(result['LOWGPA']['gpa_10'], 4.5)
+        self.assertEqual(result['DECLINE']['semester_decline'], 1.5)
+        # Học kỳ 2 là học kỳ mới nhất có điểm: tiến độ chuẩn 30 tín chỉ
+        self.assertEqual(result['SLOW']['expected_credit'], 30.0)
+        self.assertEqual(
+            (result['NOSCORE']['gpa_10'], result['NOSCORE']['semester_decline'], result['NOSCORE']['failed_credits']),
+            (None, None, 0)
+        )
+
+    def test_no_scores_or_no_students_flag_nobody(self):
+        self.assertEqual(compute_at_risk(self.STUDENTS, None, self.TOTAL_CREDIT, self.TOTAL_SEMESTER), [])
+        self.assertEqual(compute_at_risk([], self.scores(), self.TOTAL_CREDIT, self.TOTAL_SEMESTER), [])
+
+
+class ReaderParityTests(SimpleTestCase):
+
+    def read_both(self, rows, file_type):
+        content = export_xlsx(rows) if file_type == 'xlsx' else export_csv(rows)
+        baseline = bench_excel_ingest.read_baseline(io.BytesIO(content), file_type)
+        students = DataProcessor(io.BytesIO(content), file_type=file_type).get_all_student_detail()
+        return baseline, students
+
+    def test_same_frame_as_the_baseline_reader_on_the_export_layout(self):
+        for subject_columns in (1, 12):
+            body = bench_excel_ingest.random_body(25, subject_columns)
+            subjects = [f"Môn {i + 1}" for i in range(subject_columns)]
+            for group_row in (True, False):
+                rows = bench_excel_ingest.export_layout(body, subjects, group_row)
+                for file_type in ('xlsx', 'csv'):
+                    with self.subTest(subjects=subject_columns, group_row=group_row, file_type=file_type):
+                        pd.testing.assert_frame_equal(*self.read_both(rows, file_type))
+
+    def test_openpyxl_fallback_matches_too(self):
+        rows = export_rows([(20000001, 'Ánh', 30, 7.25), (20000002, 'Đức', 45, 8.5)])
+        with mock.patch.multiple(utils, _HAS_CALAMINE=False, EXCEL_ENGINE='openpyxl'):
+            pd.testing.assert_frame_equal(*self.read_both(rows, 'xlsx'))
+
+
+class ClassExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, teacher = create_teacher('exporter')
+        university_class = create_class(teacher, 'EXPORT', students=3)
+        subjects = Subject.objects.bulk_create([
+            Subject(subject_id='EX-2', subject_name='Cấu trúc dữ liệu', credit=3),
+            Subject(subject_id='EX-1', subject_name='Nhập môn lập trình', credit=3),
+            Subject(subject_id='EX-X', subject_name='Môn tự chọn', credit=2),
+        ])
+        Subject_class.objects.create(class_name=university_class, subject=subjects[0], semester_id=2)
+        Subject_class.objects.create(class_name=university_class, subject=subjects[1], semester_id=1)
+        # EX-X không thuộc chương trình của lớp nhưng có điểm: cột cuối cùng
+        Subject_student.objects.bulk_create([
+            Subject_student(student_id='EXPORT-0000', subject=subjects[1], score_10=8.0),
+            Subject_student(student_id='EXPORT-0000', subject=subjects[0], score_10=6.5),
+            Subject_student(student_id='EXPORT-0002', subject=subjects[2], score_10=9.0),
+        ])
+        cls.header = list(exports.STUDENT_EXPORT_FIELDS) + [
+            'Nhập môn lập trình (EX-1)', 'Cấu trúc dữ liệu (EX-2)', 'Môn tự chọn (EX-X)'
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+
+    def export(self, file_format):
+        response = self.client.get(f'/api/classes/EXPORT/export/?format={file_format}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], exports.EXPORT_CONTENT_TYPES[file_format])
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="EXPORT.{file_format}"')
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        content = self.export('csv')
+        self.assertTrue(content.startswith('\ufeff'.encode('utf-8')))
+        rows = list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+        self.assertEqual(rows[0], self.header)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row[0] for row in rows[1:]], ['EXPORT-0000', 'EXPORT-0001', 'EXPORT-0002'])
+        self.assertEqual(rows[1][-3:], ['8.0', '6.5', ''])
+        self.assertEqual(rows[3][-3:], ['', '', '9.0'])
+
+    def test_xlsx(self):
+        workbook = load_workbook(io.BytesIO(self.export('xlsx')))
+        rows = list(workbook['Export'].iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), self.header)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row[0] for row in rows[1:]], ['EXPORT-0000', 'EXPORT-0001', 'EXPORT-0002'])
+        self.assertEqual(rows[1][-3:], (8.0, 6.5, None))
+
+    def test_parquet_needs_pyarrow(self):
+        with mock.patch.object(exports, 'pa', None):
+            response = self.client.get('/api/classes/EXPORT/export/?format=parquet')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('csv, xlsx', response.json()['error'])
+
+
+class RosterZipTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _, teacher = create_teacher('zipper')
+        _, other_teacher = create_teacher('zipper-other')
+        create_class(teacher, 'RZ-A', students=0)
+        create_class(teacher, 'RZ-B', students=0)
+        create_class(other_teacher, 'RZ-OTHER', students=0)
+        cls.owned = ['RZ-A', 'RZ-B']
+
+    def setUp(self):
+        cache.clear()
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        overrides = override_settings(IMPORT_UPLOAD_DIR=upload_dir.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def roster(self, first_id):
+        return export_rows([(first_id, 'An', 30, 7.25), (first_id + 1, 'Bình', 45, 8.5)])
+
+    def build_zip(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('lop/', '')
+            for name, content in members.items():
+                archive.writestr(name, content)
+        buffer.seek(0)
+        return buffer
+
+    def test_class_comes_from_the_file_name_or_the_first_sheet(self):
+        source = self.build_zip({
+            'lop/RZ-A.csv': export_csv(self.roster(21000001)),
+            'danh-sach.xlsx': export_xlsx(self.roster(21000011), sheet_name='RZ-B'),
+            'ghi-chu.csv': b'khong phai lop nao',
+            '__MACOSX/lop/._RZ-A.csv': b'metadata',
+            'huong-dan.txt': b'bo qua',
+        })
+        jobs_created, results = batch.create_roster_jobs(source, class_names=self.owned)
+
+        self.assertEqual(
+            [(r['file_name'], r['class_name'], r['status']) for r in results],
+            [('lop/RZ-A.csv', 'RZ-A', 'pending'), ('danh-sach.xlsx', 'RZ-B', 'pending'),
+             ('ghi-chu.csv', None, 'failed')]
+        )
+        self.assertEqual([(job.class_name_id, job.file_type) for job in jobs_created], [('RZ-A', 'csv'), ('RZ-B', 'xlsx')])
+        for job in jobs_created:
+            self.assertTrue(os.path.exists(job.file_path))
+
+    def test_classes_of_other_teachers_are_not_matched(self):
+        source = self.build_zip({'RZ-OTHER.csv': export_csv(self.roster(21000021))})
+        jobs_created, results = batch.create_roster_jobs(source, class_names=self.owned)
+        self.assertEqual(jobs_created, [])
+        self.assertEqual((results[0]['class_name'], results[0]['status']), (None, 'failed'))
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_a_file_already_imported_is_unchanged(self):
+        source = self.build_zip({'RZ-A.csv': export_csv(self.roster(21000031))})
+        jobs_created, _ = batch.create_roster_jobs(source, class_names=self.owned)
+        with mock.patch.object(jobs, 'close_old_connections'), mock.patch.object(jobs, 'connection'):
+            jobs.run_import_batch([job.job_id for job in jobs_created])
+        self.assertEqual(ImportJob.objects.get().status, 'completed')
+
+        source.seek(0)
+        jobs_created, results = batch.create_roster_jobs(source, class_names=self.owned)
+        self.assertEqual(jobs_created, [])
+        self.assertEqual((results[0]['status'], results[0]['total']), ('unchanged', 2))
+
+    def test_uncompressed_size_is_capped(self):
+        source = self.build_zip({'RZ-A.csv': export_csv(self.roster(21000041))})
+        with mock.patch.object(batch, 'BATCH_MAX_UNCOMPRESSED', 100):
+            with self.assertRaisesMessage(ValueError, 'quá lớn'):
+                batch.read_roster_zip(source)
@@ -18,12 +18,22 @@ urlpatterns = [
     # User profile
     path('api/user/profile/', views.UserProfileView.as_view(), name='user_profile'),
     
+    # Teacher overview
+    path('api/teacher/overview/', views.TeacherOverviewView.as_view(), name='teacher_overview'),
+    
     # Class management
     path('api/classes/', views.ClassListCreateView.as_view(), name='class_list_create'),
+    path('api/classes/batch-upload/', views.BatchUploadStudentsView.as_view(), name='batch_upload_students'),
     path('api/classes/<str:class_name>/', views.ClassDetailView.as_view(), name='class_detail'),
     path('api/classes/<str:class_name>/students/', views.ClassStudentsView.as_view(), name='class_students'),
     path('api/classes/<str:class_name>/upload-students/', views.UploadStudentsView.as_view(), name='upload_students'),
+    path('api/classes/<str:class_name>/upload-scores/', views.UploadScoresView.as_view(), name='upload_scores'),
+    path('api/classes/<str:class_name>/imports/<uuid:job_id>/', views.ImportJobStatusView.as_view(), name='import_job_status'),
+    path('api/classes/<str:class_name>/stats/', views.ClassStatsView.as_view(), name='class_stats'),
+    path('api/classes/<str:class_name>/at-risk/', views.ClassAtRiskView.as_view(), name='class_at_risk'),
+    path('api/classes/<str:class_name>/export/', views.ClassExportView.as_view(), name='class_export'),
     path('api/classes/<str:class_name>/dashboard/', views.ClassDashboardView.as_view(), name='class_dashboard'),
+    path('api/classes/<str:class_name>/student-dashboards/', views.ClassStudentDashboardsView.as_view(), name='class_student_dashboards'),
     
     # Student dashboard
     path('api/students/<str:student_id>/dashboard/', views.StudentDashboardView.as_view(), name='student_dashboard'),
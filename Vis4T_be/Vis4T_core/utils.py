@@ -1,5 +1,6 @@
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
 User = get_user_model()
 
@@ -36,46 +37,532 @@ def create_user_response(user, include_tokens=True):
     return {'user': user_data}
 
 ##
+from functools import lru_cache
 from unidecode import unidecode
+from django.conf import settings
+from openpyxl.utils.exceptions import InvalidFileException
+import hashlib
+import os
+import tempfile
+import zipfile
+import numpy as np
 import pandas as pd
 import re
 
+from .models import Student, ClassAggregate, ImportJob, Subject_student
+from .aggregates import AGGREGATE_FIELDS, aggregate_row, apply_student_delta, bump_class_version
+from .ranking import rank_class
+
+# File nhỏ hơn ngưỡng này được giữ trong RAM, lớn hơn thì ghi tạm ra đĩa
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+CSV_CHUNK_SIZE = 10000
+
+# Bố cục file xuất từ hệ thống của trường: 9 dòng tiêu đề, 2 dòng footer
+DEFAULT_HEADER_ROW = 9
+FOOTER_ROWS = 2
+HEADER_SCAN_ROWS = 30
+DROPPED_COLUMNS = ('Unnamed: 0', 'Điểm', 'Xếp loại.1')
+
+try:
+    import python_calamine
+    # Engine calamine (Rust) nhanh hơn openpyxl nhiều lần, cần pandas >= 2.2
+    _HAS_CALAMINE = tuple(int(part) for part in pd.__version__.split('.')[:2]) >= (2, 2)
+    _CALAMINE_ERRORS = (python_calamine.CalamineError,)
+except ImportError:
+    _HAS_CALAMINE = False
+    _CALAMINE_ERRORS = ()
+EXCEL_ENGINE = 'calamine' if _HAS_CALAMINE else 'openpyxl'
+
+# Lỗi khi đọc một file hỏng hoặc sai bố cục: lỗi của file upload, không phải của server
+PARSE_ERRORS = (
+    ValueError, KeyError, IndexError, zipfile.BadZipFile, InvalidFileException, *_CALAMINE_ERRORS
+)
+
+
+def detect_file_type(source) -> str:
+    """Return 'xlsx' or 'csv' from a path or an object with a .name"""
+    name = str(source if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '') or '')
+    if name.endswith('xlsx'):
+        return 'xlsx'
+    if name.endswith('csv'):
+        return 'csv'
+    raise ValueError("Chỉ hỗ trợ file Excel (.xlsx) hoặc CSV (.csv)")
+
+
+def open_source(source):
+    """
+    Turn a path, Django UploadedFile or buffer into something pandas can read.
+
+    Django already keeps small uploads in memory and spills big ones to a
+    temporary file, so those are used as-is. Other non-seekable streams are
+    copied into a SpooledTemporaryFile that only hits the disk above
+    SPOOL_MAX_SIZE.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    if hasattr(source, 'temporary_file_path'):
+        return source.temporary_file_path()
+    if hasattr(source, 'seekable') and source.seekable():
+        source.seek(0)
+        return source
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    chunks = source.chunks() if hasattr(source, 'chunks') else iter(lambda: source.read(64 * 1024), b'')
+    for chunk in chunks:
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def detect_header_row(head: pd.DataFrame) -> int:
+    """
+    Dòng tiêu đề là dòng cuối cùng trước dòng dữ liệu đầu tiên có ít nhất
+    nửa số ô của dòng đầy nhất và mọi ô đều là chữ (các dòng tên trường/khoa
+    phía trên chỉ có 1-2 ô, dòng dữ liệu có điểm là số). Lấy dòng cuối vì
+    file xuất có thể có thêm một dòng nhóm cột (Mã SV, Học kỳ 1...) gộp ô
+    ngay phía trên. Không tìm thấy thì dùng DEFAULT_HEADER_ROW.
+    """
+    counts = head.notna().sum(axis=1)
+    if counts.empty:
+        return DEFAULT_HEADER_ROW
+    threshold = max(counts.max() / 2, 3)
+    header_row = None
+    for position, (_, row) in enumerate(head.iterrows()):
+        values = row.dropna()
+        if len(values) < threshold:
+            continue
+        if all(isinstance(value, str) for value in values):
+            header_row = position
+        elif header_row is not None:
+            break
+    return DEFAULT_HEADER_ROW if header_row is None else header_row
+
+
+def column_labels(row) -> list:
+    """Column names the way pandas builds them: 'Unnamed: i' for blanks, '.1' suffix for duplicates"""
+    labels, seen = [], {}
+    for i, value in enumerate(row):
+        label = f"Unnamed: {i}" if pd.isna(value) else str(value)
+        count = seen.get(label, 0)
+        seen[label] = count + 1
+        labels.append(f"{label}.{count}" if count else label)
+    return labels
+
+
+def restore_numeric_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast the columns of a CSV read with its footer to the types the xlsx
+    reader gives the same data. The footer text turns numeric columns into
+    strings and its blank cells turn integer columns into float64, and
+    infer_objects() undoes neither: text columns holding only numbers
+    become numeric, float columns holding only whole numbers become int64.
+    """
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object or pd.api.types.is_string_dtype(values):
+            numeric = pd.to_numeric(values, errors='coerce')
+            if numeric.notna().sum() != values.notna().sum():
+                continue
+            values = numeric
+        if values.dtype.kind == 'f' and values.notna().all() and (values % 1 == 0).all():
+            values = values.astype('int64')
+        df[col] = values
+    return df
+
+
 class DataProcessor:
-    def __init__(self, filename: str) -> None:
-        if filename.endswith('xlsx'):
-            self.df = pd.read_excel(filename, skiprows=9, skipfooter=2)
-        elif filename.endswith('csv'):
-            self.df = pd.read_csv(filename, skiprows=9, skipfooter=2)
-
-        get_raw_cols = list(self.df.columns)
-        if 'Unnamed: 0' in get_raw_cols:
-            self.df.drop(columns='Unnamed: 0', inplace=True)
-        if 'Điểm' in get_raw_cols:
-            self.df.drop(columns='Điểm', inplace=True)
-        if 'Xếp loại.1' in get_raw_cols:
-            self.df.drop(columns='Xếp loại.1', inplace=True)
+    def __init__(self, source, file_type: str = None, fast: bool = True) -> None:
+        """
+        source: a path, a Django UploadedFile or any binary file-like object
+        (BytesIO...). file_type is required when the buffer has no name.
+        fast=False keeps the old fixed-layout Excel read (skiprows=9, every
+        column, openpyxl), mostly for comparison in bench_excel_ingest.
+        """
+        file_type = file_type or detect_file_type(source)
+        buffer = open_source(source)
+
+        if file_type == 'xlsx':
+            if fast:
+                self.df = self.read_excel_fast(buffer)
+            else:
+                self.df = pd.read_excel(buffer, skiprows=DEFAULT_HEADER_ROW, skipfooter=FOOTER_ROWS)
+        elif file_type == 'csv':
+            self.df = self.read_csv_projected(buffer)
+        else:
+            raise ValueError(f"Unsupported file type: {file_type}")
+
+        self.df.drop(columns=[col for col in DROPPED_COLUMNS if col in self.df.columns], inplace=True)
+
+    def read_csv_projected(self, buffer):
+        """
+        Read the CSV in CSV_CHUNK_SIZE-row chunks and keep only the columns
+        of needed_columns() from each chunk as it arrives, so at most one
+        full-width chunk is in memory next to the projected result.
+        """
+        parts, usecols = [], None
+        for i, chunk in enumerate(pd.read_csv(buffer, skiprows=DEFAULT_HEADER_ROW, chunksize=CSV_CHUNK_SIZE)):
+            if i == 0:
+                usecols = self.needed_columns(list(chunk.columns))
+            parts.append(chunk.iloc[:, usecols] if usecols is not None else chunk)
+        if not parts:
+            return pd.DataFrame()
+
+        df = pd.concat(parts, ignore_index=True)
+        df.drop(index=df.index[-FOOTER_ROWS:], inplace=True)
+        return restore_numeric_dtypes(df.reset_index(drop=True))
+
+    def read_excel_fast(self, buffer):
+        """
+        Find the header row in the first rows of the sheet instead of
+        assuming DEFAULT_HEADER_ROW, and keep only the columns selected by
+        needed_columns().
+
+        calamine parses a sheet fast enough that scanning the head and then
+        re-reading with usecols pays off. openpyxl has to parse every cell
+        of the sheet whatever usecols says, so there the sheet is read once
+        and the header, footer and columns are cut in memory.
+        """
+        if not _HAS_CALAMINE:
+            return self.slice_sheet(pd.read_excel(buffer, header=None, engine=EXCEL_ENGINE))
+
+        head = pd.read_excel(buffer, header=None, nrows=HEADER_SCAN_ROWS, engine=EXCEL_ENGINE)
+        header_row = detect_header_row(head)
+        labels = column_labels(head.iloc[header_row]) if header_row < len(head) else None
+        usecols = self.needed_columns(labels) if labels else None
+
+        if hasattr(buffer, 'seek'):
+            buffer.seek(0)
+        return pd.read_excel(
+            buffer, header=header_row, usecols=usecols,
+            skipfooter=FOOTER_ROWS, engine=EXCEL_ENGINE
+        )
+
+    def slice_sheet(self, raw):
+        """Header row, body without the footer and needed columns of a sheet read with header=None"""
+        header_row = detect_header_row(raw.head(HEADER_SCAN_ROWS))
+        if header_row >= len(raw):
+            return pd.DataFrame()
+        labels = column_labels(raw.iloc[header_row])
+        body = raw.iloc[header_row + 1:max(len(raw) - FOOTER_ROWS, header_row + 1)]
+        body = body.set_axis(labels, axis=1)
+
+        usecols = self.needed_columns(labels)
+        if usecols is not None:
+            body = body.iloc[:, usecols]
+        # Cột đọc chung với dòng tiêu đề là object, suy lại kiểu số như khi đọc có header
+        return body.reset_index(drop=True).infer_objects()
+
+    def needed_columns(self, labels):
+        """
+        Positions of the columns get_all_student_detail() reads: the first
+        3 and the last 5 once DROPPED_COLUMNS are left out
+        """
+        kept = [i for i, label in enumerate(labels) if label not in DROPPED_COLUMNS]
+        if len(kept) < 8:
+            return None
+        return kept[:3] + kept[-5:]
 
     
     def get_all_student_detail(self):
         col_names = ['student_id', 'passed_credit', 'score_10', 'score_4', 'score_char', 'rank', 'student_name', 'student_gmail']
 
-        df = self.df.copy()
-        df = df.drop(columns=df.columns[3:-5])
-        rename_map = {
-            'Unnamed: 1': 'student_id',
-            'Unnamed: 2': 'first_name',
-            'Unnamed: 3': 'last_name'
-        }
+        # 3 cột đầu: mã SV, họ đệm, tên; 5 cột cuối: tín chỉ, điểm, xếp loại
+        id_col, first_col, last_col = self.df.columns[:3]
+        score_cols = self.df.columns[-5:]
 
-        df.rename(columns=rename_map, inplace=True)
-        
         # normalize student_id
-        df['student_id'] = df['student_id'].astype('int')
-        
-        df['student_name'] = df['first_name'] + ' ' + df['last_name']
-        df['student_gmail'] = df.apply(lambda x: f"{unidecode(str(x['last_name']).lower())}.{x['student_id']}@iuh.edu.vn", axis=1)
-        
-        df.drop(columns=['first_name', 'last_name'], inplace=True)
-        
-        df.columns = col_names
-        return df
\ No newline at end of file
+        student_id = self.df[id_col].astype('int')
+        last_name = self.df[last_col]
+
+        data = {'student_id': student_id}
+        data.update(zip(col_names[1:6], (self.df[col] for col in score_cols)))
+        data['student_name'] = self.df[first_col] + ' ' + last_name
+        data['student_gmail'] = (
+            transliterate_column(last_name.astype(str))
+            + '.' + student_id.astype(str) + '@iuh.edu.vn'
+        )
+        return pd.DataFrame(data, columns=col_names)
+
+
+class TranscriptProcessor(DataProcessor):
+    """
+    Bảng điểm theo môn của lớp: cùng phần đầu/cuối file như danh sách sinh
+    viên, 3 cột đầu là mã SV, họ đệm, tên, mỗi cột còn lại là một môn học
+    (tiêu đề là tên môn, giá trị là điểm hệ 10).
+    """
+
+    def needed_columns(self, labels):
+        # Mỗi cột sau 3 cột định danh là một môn nên phải đọc đủ
+        return None
+
+    def get_subject_columns(self):
+        """Header of every column holding at least one numeric score"""
+        columns = []
+        for col in self.df.columns[3:]:
+            if pd.to_numeric(self.df[col], errors='coerce').notna().any():
+                columns.append(col)
+        return columns
+
+    def get_all_subject_scores(self, subject_columns=None):
+        """Long (student_id, subject_name, score_10) frame, blanks dropped"""
+        subject_columns = self.get_subject_columns() if subject_columns is None else subject_columns
+        id_col = self.df.columns[0]
+        scores = self.df[[id_col, *subject_columns]].melt(
+            id_vars=id_col, var_name='subject_name', value_name='score_10'
+        )
+        scores['score_10'] = pd.to_numeric(scores['score_10'], errors='coerce')
+        scores = scores.dropna(subset=[id_col, 'score_10'])
+        scores = scores.rename(columns={id_col: 'student_id'})
+        scores['student_id'] = scores['student_id'].astype('int').astype(str)
+        return scores.reset_index(drop=True)
+
+
+@lru_cache(maxsize=4096)
+def transliterate_lower(text: str) -> str:
+    """Lowercase + strip Vietnamese accents, memoized since names repeat a lot"""
+    return unidecode(text.lower())
+
+
+def transliterate_column(series: pd.Series) -> pd.Series:
+    """
+    Transliterate a string column by converting each distinct value once
+    and broadcasting the result back with the factorized codes.
+    """
+    codes, uniques = pd.factorize(series)
+    table = np.array([transliterate_lower(value) for value in uniques], dtype=object)
+    return pd.Series(table[codes], index=series.index)
+
+
+STUDENT_UPSERT_FIELDS = [
+    'class_name', 'student_name', 'student_gmail', 'passed_credit',
+    'score_10', 'score_4', 'score_char', 'rank'
+]
+# Các cột lấy từ file: kiểm tra trước khi ghi để một dòng lỗi không làm hỏng cả batch
+STUDENT_ROW_FIELDS = [
+    Student._meta.get_field(name)
+    for name in ['student_id', *STUDENT_UPSERT_FIELDS]
+    if name != 'class_name'
+]
+
+
+def student_row_errors(student):
+    """NULL/NaN or blank required values and values over max_length"""
+    problems = []
+    for field in STUDENT_ROW_FIELDS:
+        value = getattr(student, field.attname)
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            problems.append(f"thiếu {field.name}")
+        elif value == '' and not field.blank:
+            problems.append(f"thiếu {field.name}")
+        elif field.max_length and len(str(value)) > field.max_length:
+            problems.append(f"{field.name} dài quá {field.max_length} ký tự")
+    return problems
+
+
+def bulk_upsert_students(university_class, students_data, batch_size=500, progress=None):
+    """
+    Insert or update all students of a roster in a few set-based statements.
+
+    Rows are written batch_size at a time: each batch loads the old values
+    of its ids with one query and is written with INSERT ... ON CONFLICT
+    (student_id) DO UPDATE, together with its ClassAggregate delta. The
+    ranks of the class, and of every class a student was moved out of, are
+    recomputed in one vectorized pass per class at the end. Everything runs
+    in one transaction, so a failure leaves the class as it was.
+    progress(rows_done) is called after every batch; it runs inside that
+    transaction and must publish outside the database (see report_progress).
+    Returns (created_count, updated_count, errors) like the per-row path.
+    """
+    errors = []
+    students = {}
+
+    for row in students_data.itertuples(index=False):
+        try:
+            student = Student(
+                student_id=None if pd.isna(row.student_id) else str(row.student_id),
+                class_name=university_class,
+                student_name=row.student_name,
+                student_gmail=row.student_gmail,
+                passed_credit=int(row.passed_credit),
+                score_10=float(row.score_10),
+                score_4=float(row.score_4),
+                score_char=row.score_char,
+                rank=row.rank if isinstance(row.rank, str) else ''
+            )
+        except Exception as e:
+            errors.append(f"Lỗi xử lý sinh viên {row.student_id}: {str(e)}")
+            continue
+        problems = student_row_errors(student)
+        if problems:
+            errors.append(f"Lỗi xử lý sinh viên {row.student_id}: {', '.join(problems)}")
+            continue
+        # Dòng trùng mã sinh viên: giữ dòng cuối như update_or_create tuần tự
+        students[student.student_id] = student
+
+    duplicated_count = len(students_data) - len(errors) - len(students)
+    if not students:
+        return 0, duplicated_count, errors
+
+    rows = list(students.values())
+    with transaction.atomic():
+        existing_count = 0
+        left_classes = set()
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            # Một truy vấn lấy cả các giá trị cũ để cập nhật ClassAggregate tăng dần
+            existing = {
+                row[0]: row[1:]
+                for row in Student.objects.filter(student_id__in=[s.student_id for s in batch])
+                .values_list('student_id', *AGGREGATE_FIELDS)
+            }
+            Student.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['student_id'],
+                update_fields=STUDENT_UPSERT_FIELDS,
+            )
+            for student_id, old_row in existing.items():
+                # is_graduated không nằm trong file upload nên giữ nguyên giá trị cũ
+                students[student_id].is_graduated = old_row[-1]
+            apply_student_delta(
+                added=[aggregate_row(student) for student in batch],
+                removed=list(existing.values())
+            )
+            existing_count += len(existing)
+            # Sinh viên chuyển từ lớp khác sang: lớp cũ cũng phải xếp hạng lại
+            left_classes.update(old_row[0] for old_row in existing.values())
+            if progress is not None:
+                progress(start + len(batch))
+
+        left_classes.discard(university_class.class_name)
+        for class_name in [university_class.class_name, *sorted(left_classes)]:
+            rank_class(class_name)
+
+    created_count = len(students) - existing_count
+    updated_count = existing_count + duplicated_count
+    return created_count, updated_count, errors
+
+
+def bulk_upsert_subject_scores(class_name, scores, batch_size=1000):
+    """
+    Insert or update Subject_student rows of one class in set-based writes.
+
+    scores is a frame with student_id, subject_id and score_10 columns
+    (subject names already matched). Students outside the class and scores
+    outside 0-10 are reported as errors. Returns (created, updated, errors).
+    """
+    errors = []
+    class_students = set(
+        Student.objects.filter(class_name_id=class_name).values_list('student_id', flat=True)
+    )
+
+    rows = {}
+    for row in scores.itertuples(index=False):
+        if row.student_id not in class_students:
+            errors.append(f"Sinh viên {row.student_id} không thuộc lớp {class_name}")
+            continue
+        if not 0 <= row.score_10 <= 10:
+            errors.append(f"Điểm không hợp lệ của sinh viên {row.student_id}, môn {row.subject_id}: {row.score_10}")
+            continue
+        # Trùng (sinh viên, môn): giữ dòng cuối
+        rows[(row.student_id, row.subject_id)] = float(row.score_10)
+
+    if not rows:
+        return 0, 0, errors
+
+    with transaction.atomic():
+        existing = set(
+            Subject_student.objects.filter(
+                student__class_name_id=class_name,
+                subject_id__in={subject_id for _, subject_id in rows}
+            ).values_list('student_id', 'subject_id')
+        )
+        Subject_student.objects.bulk_create(
+            [
+                Subject_student(student_id=student_id, subject_id=subject_id, score_10=score)
+                for (student_id, subject_id), score in rows.items()
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['student', 'subject'],
+            update_fields=['score_10'],
+        )
+        # Điểm theo môn không nằm trong ClassAggregate nhưng vẫn làm lớp thay đổi
+        bump_class_version(class_name)
+
+    updated_count = len(existing.intersection(rows))
+    return len(rows) - updated_count, updated_count, errors
+
+
+def hash_upload(uploaded_file) -> str:
+    """SHA-256 of the uploaded bytes, read chunk by chunk"""
+    digest = hashlib.sha256()
+    if hasattr(uploaded_file, 'chunks'):
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+    else:
+        uploaded_file.seek(0)
+        for chunk in iter(lambda: uploaded_file.read(64 * 1024), b''):
+            digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def save_upload(source, suffix: str = '') -> str:
+    """
+    Write an upload (Django UploadedFile, read chunk by chunk, or bytes) to
+    a new file under IMPORT_UPLOAD_DIR and return its path
+    """
+    directory = settings.IMPORT_UPLOAD_DIR
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    with os.fdopen(fd, 'wb') as output:
+        if isinstance(source, bytes):
+            output.write(source)
+        else:
+            for chunk in source.chunks():
+                output.write(chunk)
+    return path
+
+
+def remove_upload(path: str) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def current_class_version(class_name: str):
+    return ClassAggregate.objects.filter(class_name_id=class_name).values_list('version', flat=True).first()
+
+
+def get_cached_upload(file_hash: str, class_name: str):
+    """
+    Kết quả import trước đó của cùng file cho cùng lớp, hoặc None.
+    Tra trong bảng import_job (dùng chung cho mọi worker gunicorn): job
+    hoàn thành gần nhất có cùng hash. Nếu lớp đã thay đổi sau lần import đó
+    (version khác) thì coi như chưa có.
+    """
+    previous = (
+        ImportJob.objects.filter(class_name_id=class_name, file_hash=file_hash, status='completed')
+        .order_by('-finished_at')
+        .values('total', 'errors', 'class_version')
+        .first()
+    )
+    if previous is None or previous['class_version'] != current_class_version(class_name):
+        return None
+    return previous
+
+
+def prune_import_jobs(class_name: str, keep: int = None):
+    """Delete finished jobs of a class beyond the `keep` most recent ones"""
+    keep = keep if keep is not None else getattr(settings, 'IMPORT_JOB_HISTORY', 20)
+    stale_ids = list(
+        ImportJob.objects.filter(class_name_id=class_name, status__in=['completed', 'failed'])
+        .order_by('-created_at')
+        .values_list('job_id', flat=True)[keep:]
+    )
+    if stale_ids:
+        ImportJob.objects.filter(job_id__in=stale_ids).delete()
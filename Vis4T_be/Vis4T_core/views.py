@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework.response import Response
@@ -11,24 +11,45 @@ from django.contrib.auth import authenticate, login, logout
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from rest_framework.parsers import MultiPartParser, FormParser
-import tempfile
-import os
-import hashlib
-import hmac
-import time
-import json
 from urllib.parse import urlencode
+import hashlib
+import zipfile
 from django.conf import settings
+from django.db import transaction
+from django.core.cache import cache
 from .serializers import (
     UserRegistrationSerializer, 
     UserLoginSerializer, 
     UserSerializer, 
     TeacherSerializer,
     UniversityClassSerializer,
-    StudentSerializer
+    StudentSerializer,
+    ImportJobSerializer,
+    StudentRowSerializer,
+    UniversityClassRowSerializer
+)
+from .models import User, Teacher, UniversityClass, Student, ImportJob
+from .utils import (
+    detect_file_type, hash_upload, get_cached_upload, save_upload,
+    TranscriptProcessor, bulk_upsert_subject_scores, PARSE_ERRORS
+)
+from .subject_matcher import SubjectMatcher
+from .batch import create_roster_jobs
+from .exports import (
+    EXPORT_CONTENT_TYPES, ExportContentNegotiation, available_formats, export_class
+)
+from .jobs import enqueue_import, enqueue_import_batch, job_progress, recover_jobs
+from .analytics import (
+    load_class_columns, compute_class_stats, get_class_at_risk, load_at_risk_counts,
+    load_teacher_class_groups, compute_teacher_overview, OVERVIEW_CACHE_TIMEOUT
+)
+from .teachers import get_teacher
+from .pagination import StudentCursorPagination
+from .conditional import (
+    ConditionalGetMixin, class_version_stamp, teacher_classes_stamp, user_version_stamp
 )
-from .models import User, Teacher, UniversityClass, Student
-from .utils import DataProcessor
+from .metabase import EMBED_TOKEN_TTL, get_dashboard_embed_url
+from .permissions import IsClassOwner, IsStudentOwner, owned_classes
 
 # Create your views here.
 
@@ -39,7 +60,7 @@ def health_check(request):
         "status": 200,
         "message": "Vis4Teacher API is running!"
     }
-    return JsonResponse(data)
+    return Response(data)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(APIView):
@@ -143,31 +164,26 @@ class RefreshTokenView(APIView):
             }, status=status.HTTP_401_UNAUTHORIZED)
 
 # Class Management Views
-class ClassListCreateView(generics.ListCreateAPIView):
+class ClassListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = UniversityClassSerializer
     
+    def get_version_stamp(self):
+        return user_version_stamp(self.request.user)
+    
     def get_queryset(self):
         teacher = self.get_or_create_teacher()
-        return UniversityClass.objects.filter(teacher=teacher)
+        return UniversityClass.objects.filter(teacher=teacher).select_related('aggregate')
     
     def get_or_create_teacher(self):
         """Helper method to get or create teacher for current user"""
-        try:
-            return Teacher.objects.get(email=self.request.user.email)
-        except Teacher.DoesNotExist:
-            return Teacher.objects.create(
-                teacher_id=f"T{self.request.user.id:06d}",
-                email=self.request.user.email,
-                password="",
-                teacher_fullname=self.request.user.full_name or self.request.user.username,
-                year_of_birth=1990,
-                academic_title="Giảng viên", 
-                major="Chưa xác định",
-                gender="O",
-                number_of_current_class=0,
-                phone_number=""
-            )
+        return get_teacher(self.request.user, create=True)
+    
+    def list(self, request, *args, **kwargs):
+        # Lớp + ClassAggregate trong một truy vấn LEFT JOIN .values()
+        serializer = UniversityClassRowSerializer()
+        rows = self.get_queryset().values(*serializer.columns)
+        return Response(serializer.serialize_many(rows))
     
     def create(self, request, *args, **kwargs):
         teacher = self.get_or_create_teacher()
@@ -195,47 +211,68 @@ class ClassListCreateView(generics.ListCreateAPIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 class ClassDetailView(generics.RetrieveUpdateDestroyAPIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsClassOwner]
     serializer_class = UniversityClassSerializer
     lookup_field = 'class_name'
     
     def get_queryset(self):
-        try:
-            teacher = Teacher.objects.get(email=self.request.user.email)
-        except Teacher.DoesNotExist:
-            # Tạo Teacher record tự động nếu chưa có
-            teacher = Teacher.objects.create(
-                teacher_id=f"T{self.request.user.id:06d}",  # T000001 format
-                email=self.request.user.email,
-                password="",  # Not used for auth
-                teacher_fullname=self.request.user.full_name or self.request.user.username,
-                year_of_birth=1990,  # default value
-                academic_title="Giảng viên", 
-                major="Chưa xác định",
-                gender="O",
-                number_of_current_class=0,
-                phone_number=""
-            )
-        return UniversityClass.objects.filter(teacher=teacher)
+        return owned_classes(self.request.user).select_related('aggregate')
 
-class ClassStudentsView(generics.ListAPIView):
-    permission_classes = [IsAuthenticated]
+class ClassStudentsView(ConditionalGetMixin, generics.ListAPIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
     serializer_class = StudentSerializer
+    pagination_class = StudentCursorPagination
+    
+    # Giá trị hợp lệ của ?ordering=, luôn kết thúc bằng student_id để thứ tự là duy nhất
+    ORDERINGS = {
+        'student_id': ('student_id',),
+        '-student_id': ('-student_id',),
+        'score_10': ('score_10', 'student_id'),
+        '-score_10': ('-score_10', 'student_id'),
+        'score_4': ('score_4', 'student_id'),
+        '-score_4': ('-score_4', 'student_id'),
+        'class_rank': ('class_rank', 'student_id'),
+    }
+    
+    def get_version_stamp(self):
+        return class_version_stamp(self.request, self.kwargs['class_name'])
+    
+    def get_ordering(self):
+        return self.ORDERINGS.get(self.request.query_params.get('ordering'), ('student_id',))
+    
+    def get_requested_fields(self):
+        """Parse ?fields=a,b,c; unknown names are ignored"""
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        allowed = StudentSerializer.Meta.fields
+        fields = [name for name in (f.strip() for f in raw.split(',')) if name in allowed]
+        return fields or None
     
     def get_queryset(self):
-        class_name = self.kwargs['class_name']
-        try:
-            teacher = Teacher.objects.get(email=self.request.user.email)
-            return Student.objects.filter(
-                class_name__class_name=class_name,
-                class_name__teacher=teacher
-            )
-        except Teacher.DoesNotExist:
-            return Student.objects.none()
+        # Quyền sở hữu lớp đã được IsClassOwner kiểm tra
+        queryset = Student.objects.filter(class_name_id=self.kwargs['class_name'])
+        if 'ordering' in self.request.query_params:
+            queryset = queryset.order_by(*self.get_ordering())
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        # Một truy vấn .values() chỉ gồm các cột cần thiết (không N+1 qua class_name)
+        # và serializer nhẹ thay cho StudentSerializer, JSON trả về giữ nguyên
+        serializer = StudentRowSerializer(fields=self.get_requested_fields())
+        columns = set(serializer.columns)
+        columns.update(name.lstrip('-') for name in self.get_ordering())
+        queryset = self.get_queryset().values(*columns)
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize_many(page))
+        return Response(serializer.serialize_many(queryset))
 
 
 class UploadStudentsView(APIView):
-    permission_classes = [IsAuthenticated]
+    # IsClassOwner kiểm tra quyền của teacher với lớp trước khi vào post()
+    permission_classes = [IsAuthenticated, IsClassOwner]
     parser_classes = [MultiPartParser, FormParser]
     
     def post(self, request, class_name):
@@ -254,24 +291,6 @@ class UploadStudentsView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Kiểm tra quyền của teacher
-            try:
-                teacher = Teacher.objects.get(email=request.user.email)
-                university_class = UniversityClass.objects.get(
-                    class_name=class_name,
-                    teacher=teacher
-                )
-            except Teacher.DoesNotExist:
-                return Response(
-                    {"error": "Bạn không có quyền thực hiện hành động này"}, 
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            except UniversityClass.DoesNotExist:
-                return Response(
-                    {"error": "Lớp học không tồn tại hoặc bạn không có quyền truy cập"}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
             uploaded_file = request.FILES['file']
             
             # Kiểm tra định dạng file
@@ -281,151 +300,311 @@ class UploadStudentsView(APIView):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Lưu file tạm thời để xử lý
-            with tempfile.NamedTemporaryFile(
-                delete=False, 
-                suffix='.xlsx' if uploaded_file.name.endswith('.xlsx') else '.csv'
-            ) as temp_file:
-                for chunk in uploaded_file.chunks():
-                    temp_file.write(chunk)
-                temp_file_path = temp_file.name
-            
-            try:
-                # Sử dụng DataProcessor để xử lý file
-                processor = DataProcessor(temp_file_path)
-                students_data = processor.get_all_student_detail()
-                
-                # Kiểm tra dữ liệu có hợp lệ không
-                if students_data.empty:
-                    return Response(
-                        {"error": "File không chứa dữ liệu hợp lệ"}, 
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Cập nhật hoặc tạo sinh viên
-                created_count = 0
-                updated_count = 0
-                errors = []
-                
-                for _, row in students_data.iterrows():
-                    try:
-                        student_data = {
-                            'student_id': str(row['student_id']),
-                            'class_name': university_class,
-                            'student_name': row['student_name'],
-                            'student_gmail': row['student_gmail'],
-                            'passed_credit': int(row['passed_credit']),
-                            'score_10': float(row['score_10']),
-                            'score_4': float(row['score_4']),
-                            'score_char': row['score_char']
-                        }
-                        
-                        # Tạo hoặc cập nhật sinh viên
-                        student, created = Student.objects.update_or_create(
-                            student_id=student_data['student_id'],
-                            defaults=student_data
-                        )
-                        
-                        if created:
-                            created_count += 1
-                        else:
-                            updated_count += 1
-                            
-                    except Exception as e:
-                        errors.append(f"Lỗi xử lý sinh viên {row['student_id']}: {str(e)}")
-                
-                # Xóa file tạm
-                os.unlink(temp_file_path)
-                
-                # Trả về kết quả
+            # File giống hệt lần upload trước của lớp: không cần parse và ghi lại
+            file_hash = hash_upload(uploaded_file)
+            cached = get_cached_upload(file_hash, class_name)
+            if cached is not None:
                 response_data = {
-                    'message': 'Upload thành công',
-                    'created': created_count,
-                    'updated': updated_count,
-                    'total': len(students_data),
+                    'message': 'Không có thay đổi',
+                    'unchanged': True,
+                    'created': 0,
+                    'updated': 0,
+                    'total': cached['total'],
                 }
-                
-                if errors:
-                    response_data['errors'] = errors
-                
+                if cached['errors']:
+                    response_data['errors'] = cached['errors']
                 return Response(response_data, status=status.HTTP_200_OK)
+            
+            # Lưu job vào DB và xử lý nền, trả về ngay job_id để frontend theo dõi.
+            # File được ghi ra đĩa theo từng chunk, không đọc cả file vào bộ nhớ
+            file_type = detect_file_type(uploaded_file)
+            job = ImportJob.objects.create(
+                class_name_id=class_name,
+                created_by=request.user,
+                file_name=uploaded_file.name,
+                file_type=file_type,
+                file_hash=file_hash,
+                file_path=save_upload(uploaded_file, suffix=f".{file_type}")
+            )
+            enqueue_import(job)
+            
+            return Response({
+                'message': 'Đã nhận file, đang xử lý',
+                'job_id': str(job.job_id),
+                'status': job.status,
+                'status_url': f"/api/classes/{class_name}/imports/{job.job_id}/"
+            }, status=status.HTTP_202_ACCEPTED)
                 
-            except Exception as e:
-                # Xóa file tạm nếu có lỗi
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                    
+        except Exception as e:
+            return Response(
+                {"error": f"Có lỗi xảy ra: {str(e)}"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BatchUploadStudentsView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        """
+        Import a zip of roster files, one per class (class taken from the
+        file name or the first sheet). Only classes owned by the teacher are
+        accepted. One ImportJob is created per file and the files are parsed
+        in a process pool in the background; the response lists the jobs to
+        follow, like a single upload.
+        """
+        if 'file' not in request.FILES:
+            return Response(
+                {"error": "Vui lòng chọn file để upload"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        uploaded_file = request.FILES['file']
+        if not uploaded_file.name.endswith('.zip'):
+            return Response(
+                {"error": "Chỉ hỗ trợ file .zip chứa các file Excel (.xlsx) hoặc CSV (.csv)"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # Liên kết Teacher cũ (chỉ khớp theo email) với User trước khi lọc lớp theo user
+            get_teacher(request.user)
+        except Teacher.DoesNotExist:
+            pass
+        owned = owned_classes(request.user).values_list('class_name', flat=True)
+        try:
+            with transaction.atomic():
+                jobs, results = create_roster_jobs(uploaded_file, class_names=owned, created_by=request.user)
+                if jobs:
+                    enqueue_import_batch(jobs)
+        except (ValueError, zipfile.BadZipFile) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {"error": f"Có lỗi xảy ra: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        for result in results:
+            if 'job_id' in result:
+                result['status_url'] = f"/api/classes/{result['class_name']}/imports/{result['job_id']}/"
+        return Response({
+            'message': 'Đã nhận file, đang xử lý',
+            'total_files': len(results),
+            'queued': len(jobs),
+            'results': results,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class UploadScoresView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request, class_name):
+        """
+        Import a class transcript (one column per subject) into
+        Subject_student. Subject headers are matched against the subjects
+        of the class, then all scores are upserted in bulk.
+        """
+        if 'file' not in request.FILES:
+            return Response(
+                {"error": "Vui lòng chọn file để upload"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        uploaded_file = request.FILES['file']
+        try:
+            # Khớp tên môn một lần cho mỗi cột thay vì cho từng dòng điểm
+            matcher = SubjectMatcher.for_class(class_name)
+            # File hỏng, không phải xlsx/csv hoặc sai bố cục: lỗi của file, trả về 400
+            try:
+                processor = TranscriptProcessor(uploaded_file)
+                columns = processor.get_subject_columns()
+                subject_ids = {col: matcher.match(col) for col in columns}
+                matched = [col for col in columns if subject_ids[col] is not None]
+                unmatched = [str(col) for col in columns if subject_ids[col] is None]
+                scores = processor.get_all_subject_scores(matched)
+            except PARSE_ERRORS as e:
                 return Response(
-                    {"error": f"Lỗi xử lý file: {str(e)}"}, 
+                    {"error": "Không đọc được file bảng điểm", "detail": str(e)},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-                
+
+            scores['subject_id'] = scores['subject_name'].map(subject_ids)
+            created_count, updated_count, errors = bulk_upsert_subject_scores(class_name, scores)
+
+            response_data = {
+                'message': f'Đã import {created_count + updated_count} điểm',
+                'total': len(scores),
+                'created': created_count,
+                'updated': updated_count,
+                'matched_subjects': {str(col): subject_ids[col] for col in matched},
+            }
+            if unmatched:
+                response_data['unmatched_subjects'] = unmatched
+            if errors:
+                response_data['errors'] = errors
+            return Response(response_data, status=status.HTTP_200_OK)
+
         except Exception as e:
             return Response(
-                {"error": f"Có lỗi xảy ra: {str(e)}"}, 
+                {"error": f"Có lỗi xảy ra: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
-class ClassDashboardView(APIView):
+class ImportJobStatusView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
+    
+    def get(self, request, class_name, job_id):
+        """
+        Report progress, counts and row errors of a roster import job
+        """
+        # Khởi tạo worker nếu process vừa restart, và định kỳ nhận lại job
+        # đang chờ hoặc đã treo (worker chết sau khi process này khởi động)
+        recover_jobs()
+        
+        try:
+            job = ImportJob.objects.get(job_id=job_id, class_name_id=class_name)
+        except ImportJob.DoesNotExist:
+            return Response(
+                {"error": "Không tìm thấy job import"}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Các batch đang ghi chưa commit, tiến độ nằm trong cache
+        job.processed = job_progress(job)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+class ClassStatsView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
+    
+    def get(self, request, class_name):
+        """
+        GPA histograms, score_char distribution, credit progress and score
+        summaries of a class, computed in-process instead of through Metabase
+        """
+        total_credit = UniversityClass.objects.filter(class_name=class_name).values_list('total_credit', flat=True).first()
+        columns = load_class_columns(class_name)
+        stats = compute_class_stats(columns, total_credit)
+        stats['class_name'] = class_name
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+class TeacherOverviewView(APIView):
     permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Student count, mean GPA, score_char distribution, graduation rate and
+        at-risk count of every class of the teacher. The first four come from
+        one GROUP BY query; the at-risk counts reuse the cached payloads of
+        the at-risk endpoint, so both always agree. Cached under the versions
+        of all owned classes, so any change to one of them (import, edit, new
+        class) produces a new key.
+        """
+        try:
+            teacher = get_teacher(request.user)
+        except Teacher.DoesNotExist:
+            return Response({'classes': []}, status=status.HTTP_200_OK)
+
+        versions = [(name, version) for name, version, _ in teacher_classes_stamp(teacher)]
+        digest = hashlib.sha256(repr(versions).encode('utf-8')).hexdigest()[:32]
+        cache_key = f"teacher-overview:{teacher.pk}:{digest}"
+        data = cache.get(cache_key)
+        if data is None:
+            class_names = [name for name, _ in versions]
+            data = {'classes': compute_teacher_overview(
+                class_names, load_teacher_class_groups(teacher), load_at_risk_counts(versions)
+            )}
+            cache.set(cache_key, data, OVERVIEW_CACHE_TIMEOUT)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class ClassAtRiskView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
+
+    def get(self, request, class_name):
+        """
+        Students flagged by the at-risk rules (failed credits, low GPA,
+        semester decline, behind credit pace), cached per class version
+        """
+        stamp = class_version_stamp(request, class_name)
+        data = get_class_at_risk(class_name, stamp[0] if stamp else None)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class ClassExportView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
+    content_negotiation_class = ExportContentNegotiation
+
+    def get(self, request, class_name):
+        """
+        Stream the students of a class with one column per subject score
+        as ?format=csv (default), xlsx or parquet
+        """
+        file_format = request.query_params.get('format', 'csv').lower()
+        formats = available_formats()
+        if file_format not in formats:
+            return Response(
+                {"error": f"Định dạng không hỗ trợ, chọn một trong: {', '.join(formats)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            export_class(class_name, file_format),
+            content_type=EXPORT_CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{class_name}.{file_format}"'
+        return response
+
+
+class ClassDashboardView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
     
     def get(self, request, class_name):
         """
         Generate Metabase dashboard URL for specific class
         """
         try:
-            # Verify teacher has permission to view this class
-            teacher = Teacher.objects.get(email=request.user.email)
-            university_class = UniversityClass.objects.get(
-                class_name=class_name,
-                teacher=teacher
-            )
+            # Quyền đã được IsClassOwner kiểm tra; class_info được cache theo
+            # version của lớp nên mở lại dashboard không cần truy vấn lớp
+            stamp = class_version_stamp(request, class_name)
+            info_key = f"class-dashboard-info:{class_name}:{stamp[0]}" if stamp else None
+            class_info = cache.get(info_key) if info_key else None
+            if class_info is None:
+                university_class = UniversityClass.objects.select_related('aggregate').get(
+                    class_name=class_name
+                )
+                aggregate = getattr(university_class, 'aggregate', None)
+                class_info = {
+                    'class_name': university_class.class_name,
+                    'class_major': university_class.class_major,
+                    'number_of_student': university_class.number_of_student,
+                    'summary': aggregate.as_summary() if aggregate else None
+                }
+                if info_key:
+                    cache.set(info_key, class_info, EMBED_TOKEN_TTL)
             
-            # Metabase configuration (thêm vào settings.py sau)
-            metabase_url = getattr(settings, 'METABASE_URL', 'http://localhost:3000')
+            # Metabase configuration
             dashboard_id = getattr(settings, 'METABASE_DASHBOARD_ID', '2')
-            secret_key = getattr(settings, 'METABASE_SECRET_KEY')
             
             # Parameters for the dashboard
             params = {
                 'class_name_id': class_name
             }
-                        
-            # Generate signed URL for Metabase embedding
-            payload = {
-                'resource': {'dashboard': int(dashboard_id)},
-                'params': params,
-                'exp': int(time.time()) + 600  # Expires in 10 minutes
-            }
             
-            # Create JWT token for Metabase
-            payload_json = json.dumps(payload, separators=(',', ':'), sort_keys=True)
-            signature = hmac.new(
-                secret_key.encode('utf-8'),
-                payload_json.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Simple embedding URL (for development)
-            # For production, use proper JWT signing
-            dashboard_url = f"{metabase_url}/embed/dashboard/{dashboard_id}?" + f"?text={class_name}"
+            # Signed JWT embed URL, dùng lại đến gần lúc hết hạn
+            dashboard_url = get_dashboard_embed_url(dashboard_id, params)
                         
             return Response({
                 'dashboard_url': dashboard_url,
                 'class_name': class_name,
-                'class_info': {
-                    'class_name': university_class.class_name,
-                    'class_major': university_class.class_major,
-                    'number_of_student': university_class.number_of_student
-                }
+                'class_info': class_info
             }, status=status.HTTP_200_OK)
             
-        except Teacher.DoesNotExist:
-            return Response(
-                {"error": "Teacher not found"}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
         except UniversityClass.DoesNotExist:
             return Response(
                 {"error": "Class not found or you don't have permission to view this class"}, 
@@ -438,51 +617,26 @@ class ClassDashboardView(APIView):
             )
 
 class StudentDashboardView(APIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsStudentOwner]
     
     def get(self, request, student_id):
         """
         Generate Metabase dashboard URL for specific student
         """
         try:
-            # Verify teacher has permission to view this student
-            teacher = Teacher.objects.get(email=request.user.email)
+            # IsStudentOwner đã kiểm tra quyền bằng một truy vấn join
             student = Student.objects.get(student_id=student_id)
             
-            # Check if teacher owns the class this student belongs to
-            if student.class_name.teacher != teacher:
-                return Response(
-                    {"error": "You don't have permission to view this student"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-            
             # Metabase configuration
-            metabase_url = getattr(settings, 'METABASE_URL', 'http://localhost:3000')
             student_dashboard_id = getattr(settings, 'METABASE_STUDENT_DASHBOARD_ID', '3')
-            secret_key = getattr(settings, 'METABASE_SECRET_KEY')
             
             # Parameters for the dashboard
             params = {
                 'student_id': student_id
             }
-                        
-            # Generate signed URL for Metabase embedding
-            payload = {
-                'resource': {'dashboard': int(student_dashboard_id)},
-                'params': params,
-                'exp': int(time.time()) + 600  # Expires in 10 minutes
-            }
             
-            # Create JWT token for Metabase
-            payload_json = json.dumps(payload, separators=(',', ':'), sort_keys=True)
-            signature = hmac.new(
-                secret_key.encode('utf-8'),
-                payload_json.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-            
-            # Simple embedding URL (for development)
-            dashboard_url = f"{metabase_url}/embed/dashboard/{student_dashboard_id}?student_id={student_id}"
+            # Signed JWT embed URL, dùng lại đến gần lúc hết hạn
+            dashboard_url = get_dashboard_embed_url(student_dashboard_id, params)
                         
             return Response({
                 'dashboard_url': dashboard_url,
@@ -490,18 +644,13 @@ class StudentDashboardView(APIView):
                 'student_info': {
                     'student_id': student.student_id,
                     'student_name': student.student_name,
-                    'class_name': student.class_name.class_name,
+                    'class_name': student.class_name_id,
                     'score_10': student.score_10,
                     'score_4': student.score_4,
                     'score_char': student.score_char
                 }
             }, status=status.HTTP_200_OK)
             
-        except Teacher.DoesNotExist:
-            return Response(
-                {"error": "Teacher not found"}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
         except Student.DoesNotExist:
             return Response(
                 {"error": "Student not found"}, 
@@ -514,12 +663,45 @@ class StudentDashboardView(APIView):
             )
 
 
+class ClassStudentDashboardsView(APIView):
+    permission_classes = [IsAuthenticated, IsClassOwner]
+    
+    def get(self, request, class_name):
+        """
+        Signed dashboard URLs and summary info for every student of a class,
+        with one permission check instead of one request per student
+        """
+        # Quyền đã được IsClassOwner kiểm tra một lần cho cả lớp
+        students = (
+            Student.objects.filter(class_name_id=class_name)
+            .order_by('student_id')
+            .values('student_id', 'student_name', 'score_10', 'score_4', 'score_char')
+        )
+        
+        student_dashboard_id = getattr(settings, 'METABASE_STUDENT_DASHBOARD_ID', '3')
+        dashboards = [
+            {
+                'student_id': student['student_id'],
+                'dashboard_url': get_dashboard_embed_url(
+                    student_dashboard_id, {'student_id': student['student_id']}
+                ),
+                'student_info': dict(student, class_name=class_name)
+            }
+            for student in students
+        ]
+        
+        return Response({
+            'class_name': class_name,
+            'students': dashboards
+        }, status=status.HTTP_200_OK)
+
+
 class StudentRedirectView(APIView):
     """
     Simple redirect endpoint for Metabase click behavior
     Returns HTML that sends postMessage to parent window
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, IsStudentOwner]
     
     def get(self, request, student_id):
         html_content = f"""
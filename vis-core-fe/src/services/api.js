@@ -315,11 +315,40 @@ export const classAPI = {
     formData.append('file', file)
     formData.append('class_name', className)
     
-    return await apiRequest(`/api/classes/${className}/upload-students/`, {
+    const job = await apiRequest(`/api/classes/${className}/upload-students/`, {
       method: 'POST',
       body: formData,
       headers: {} // Remove Content-Type to let browser set it for multipart/form-data
     })
+
+    // Backend xử lý file nền và trả về job_id, chờ job hoàn thành
+    if (!job.job_id) {
+      return job
+    }
+    return await this.waitForImportJob(className, job.job_id)
+  },
+
+  // Get progress of a background import job
+  async getImportJob(className, jobId) {
+    return await apiRequest(`/api/classes/${className}/imports/${jobId}/`)
+  },
+
+  // Poll an import job until it completes or fails. The timeout is longer than
+  // the backend stale window (IMPORT_JOB_STALE_SECONDS) so a job re-claimed
+  // after a worker restart can still finish, but polling never runs forever.
+  async waitForImportJob(className, jobId, interval = 1000, timeout = 20 * 60 * 1000) {
+    const deadline = Date.now() + timeout
+    while (Date.now() < deadline) {
+      const job = await this.getImportJob(className, jobId)
+      if (job.status === 'completed') {
+        return job
+      }
+      if (job.status === 'failed') {
+        throw new Error(job.message || 'Import failed')
+      }
+      await new Promise(resolve => setTimeout(resolve, interval))
+    }
+    throw new Error('Import is taking too long, please check again later')
   },
 
   // Get Metabase dashboard URL for a class
@@ -327,6 +356,11 @@ export const classAPI = {
     return await apiRequest(`/api/classes/${classId}/dashboard/`)
   },
 
+  // Get Metabase dashboard URLs for every student of a class in one request
+  async getClassStudentDashboards(classId) {
+    return await apiRequest(`/api/classes/${classId}/student-dashboards/`)
+  },
+
   // Get Metabase dashboard URL for a student
   async getStudentDashboard(studentId) {
     return await apiRequest(`/api/students/${studentId}/dashboard/`)